@@ -0,0 +1,114 @@
+import os
+import json
+import asyncio
+import itertools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which a batch job will not change anymore
+FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Seconds between two status requests while waiting for a batch job
+POLL_INTERVAL = 60
+
+def batch_requests_path_for(extracted_filepath):
+    """
+    Path of the Batch API request file that belongs to an _extracted.txt file.
+    """
+    return extracted_filepath.rsplit('.', 1)[0] + '_batch_requests.jsonl'
+
+def _job_path_for(requests_path):
+    return requests_path.rsplit('.', 1)[0] + '_job.json'
+
+def write_batch_requests(requests_path, bodies):
+    """
+    Write one chat completion request per line in the JSONL format of the Batch API.
+    The custom_id of each request is its batch number, starting at 1.
+    """
+    with open(requests_path, 'w', encoding='utf-8') as f:
+        for batch_number, body in enumerate(bodies, start=1):
+            request = {"custom_id": f"batch-{batch_number}", "method": "POST", "url": "/v1/chat/completions", "body": body}
+            f.write(json.dumps(request, ensure_ascii=False) + '\n')
+    logger.info(f"Batch API requests saved to: {requests_path}")
+
+async def submit_batch_requests(client, requests_path, resume=False):
+    """
+    Upload a request file and create a batch job for it.
+
+    The job ID is stored next to the request file. With `resume=True` an unfinished or
+    completed job of an interrupted run is picked up again instead of paying for a new one.
+
+    Returns:
+        ID of the batch job
+    """
+    job_path = _job_path_for(requests_path)
+    if resume and os.path.exists(job_path):
+        with open(job_path, 'r', encoding='utf-8') as f:
+            batch_id = json.load(f)["id"]
+        job = await client.batches.retrieve(batch_id)
+        if job.status not in FINAL_STATUSES or job.status == "completed":
+            logger.info(f"Resuming batch job {batch_id} ({job.status})")
+            return batch_id
+
+    with open(requests_path, 'rb') as f:
+        uploaded = await client.files.create(file=f, purpose="batch")
+    job = await client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window="24h")
+    with open(job_path, 'w', encoding='utf-8') as f:
+        json.dump({"id": job.id, "input_file_id": uploaded.id}, f)
+    logger.info(f"Submitted batch job {job.id}")
+    return job.id
+
+async def wait_for_batch(client, batch_id, poll_interval=None):
+    """
+    Poll a batch job every `poll_interval` seconds (default: POLL_INTERVAL) until it is finished.
+
+    Returns:
+        The finished batch job
+    """
+    # Look once more right away, so jobs that finish at once (such as those of the mock client)
+    # do not wait a whole interval
+    delays = itertools.chain([0], itertools.repeat(poll_interval or POLL_INTERVAL))
+    while True:
+        job = await client.batches.retrieve(batch_id)
+        counts = job.request_counts
+        if counts is not None:
+            logger.info(f"Batch job {batch_id}: {job.status} ({counts.completed}/{counts.total} requests done, {counts.failed} failed)")
+        else:
+            logger.info(f"Batch job {batch_id}: {job.status}")
+        if job.status in FINAL_STATUSES:
+            return job
+        await asyncio.sleep(next(delays))
+
+async def download_batch_replies(client, job):
+    """
+    Download the results of a finished batch job.
+
+    Returns:
+        Dict mapping custom_ids to the response bodies (choices, usage) of the successful requests
+    """
+    replies = {}
+    if job.output_file_id:
+        content = await client.files.content(job.output_file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                logger.warning(f"Batch request {result.get('custom_id')} failed: {result.get('error') or response.get('body')}")
+                continue
+            replies[result["custom_id"]] = response["body"]
+    if job.error_file_id:
+        content = await client.files.content(job.error_file_id)
+        failed = sum(1 for line in content.text.splitlines() if line.strip())
+        logger.warning(f"WARNING: {failed} batch requests failed, their entries fall back to the original text")
+    return replies
+
+def finish_batch_job(requests_path):
+    """
+    Forget the job of a request file once its results are safely stored (e.g. in the journal).
+    """
+    job_path = _job_path_for(requests_path)
+    if os.path.exists(job_path):
+        os.remove(job_path)
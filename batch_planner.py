@@ -0,0 +1,195 @@
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Budgets for the texts of a single request, in estimated tokens
+MAX_INPUT_TOKENS = 6000
+MAX_OUTPUT_TOKENS = 4000
+
+# English translations of German texts come out about as long as the original,
+# the margin covers the IDs and formatting the model repeats in its reply
+OUTPUT_RATIO = 1.2
+
+# Added to the identifier of a split entry, followed by the part number.
+# Identifiers only contain hex digits, so this suffix can never collide with a real one.
+PART_SUFFIX = "part"
+
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+_NUMBER_PATTERN = re.compile(r'\d+')
+_SYMBOL_PATTERN = re.compile(r'[^\w\s]')
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens of a text without calling a tokenizer.
+
+    Words take about 1.3 tokens on average; LaTeX commands, math and punctuation
+    are mostly tokenized one symbol at a time, so each of those counts as a token.
+    """
+    words = len(_WORD_PATTERN.findall(text))
+    numbers = len(_NUMBER_PATTERN.findall(text))
+    symbols = len(_SYMBOL_PATTERN.findall(text))
+    return math.ceil(words * 1.3) + numbers + symbols
+
+def entry_cost(identifier, text):
+    """
+    Estimated (input, output) tokens of one entry inside a batch.
+    """
+    input_tokens = estimate_tokens(identifier) + estimate_tokens(text) + 2
+    output_tokens = estimate_tokens(identifier) + math.ceil(estimate_tokens(text) * OUTPUT_RATIO) + 2
+    return input_tokens, output_tokens
+
+def _safe_split_points(text, separator):
+    """
+    Positions right after `separator` where the text can be cut without
+    splitting a {...} group, a [...] argument or a $...$ math environment.
+    """
+    points = []
+    depth = 0
+    in_math = False
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            # Skip escaped characters such as \$ or \{
+            i += 2
+            continue
+        if char == '$':
+            in_math = not in_math
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth = max(0, depth - 1)
+        elif depth == 0 and not in_math and text.startswith(separator, i):
+            points.append(i + len(separator))
+        i += 1
+    return points
+
+def split_text(text, max_tokens, separators=('\n', '. ')):
+    """
+    Split an oversized text into (chunk, separator) parts of at most about `max_tokens`.
+
+    The text is cut at line breaks first and, where a line is still too long, at sentence
+    ends, always outside of braces and math; `''.join(chunk + separator ...)` gives back the
+    original text. Parts that cannot be cut safely are kept whole, even if they are too long.
+    """
+    if estimate_tokens(text) <= max_tokens or not separators:
+        return [(text, '')]
+
+    separator = separators[0]
+    points = _safe_split_points(text, separator)
+    if not points:
+        return split_text(text, max_tokens, separators[1:])
+
+    # Greedily merge the pieces between cut points into chunks that fit the budget
+    chunks = []
+    start = 0
+    last_point = 0
+    for point in points + [len(text)]:
+        if last_point > start and estimate_tokens(text[start:point]) > max_tokens:
+            chunks.append((text[start:last_point - len(separator)], separator))
+            start = last_point
+        last_point = point
+    chunks.append((text[start:], ''))
+
+    # Chunks that are still too long are cut at the next kind of separator
+    parts = []
+    for chunk, chunk_separator in chunks:
+        sub_parts = split_text(chunk, max_tokens, separators[1:])
+        sub_parts[-1] = (sub_parts[-1][0], chunk_separator)
+        parts.extend(sub_parts)
+    return parts
+
+def plan_batches(entries, batch_size, max_input_tokens=MAX_INPUT_TOKENS, max_output_tokens=MAX_OUTPUT_TOKENS, pages=None):
+    """
+    Pack (identifier, text) entries into batches, in order.
+
+    A batch is closed as soon as the next entry would exceed `batch_size` entries or the
+    estimated input or output token budget. Entries that exceed a budget on their own are
+    split into parts with identifiers "<identifier>part<n>" (see `join_split_translations`).
+
+    If `pages` maps identifiers to their page (or slide), consecutive entries of the same page
+    are kept in one batch: a batch is closed early rather than splitting a page that would fit
+    into a batch of its own, so the model sees the texts of a slide together.
+
+    Returns:
+        (batches, splits): the list of batches, and a dict mapping each split identifier
+        to its list of (part identifier, separator)
+    """
+    # Leave room for the identifier and formatting around a text
+    max_text_tokens = int(min(max_input_tokens, max_output_tokens / OUTPUT_RATIO)) - 20
+
+    # Entries (or parts of split entries) grouped by page; without page information every entry is its own group
+    page_groups = []
+    splits = {}
+    for identifier, text in entries:
+        page = pages.get(identifier) if pages else None
+        if page is None or not page_groups or page_groups[-1][0] != page:
+            page_groups.append((page, []))
+        group = page_groups[-1][1]
+
+        input_tokens, output_tokens = entry_cost(identifier, text)
+        if input_tokens <= max_input_tokens and output_tokens <= max_output_tokens:
+            group.append((identifier, text))
+            continue
+
+        parts = split_text(text, max_text_tokens)
+        if len(parts) == 1:
+            logger.warning(f"WARNING: {identifier} exceeds the token budget but cannot be split safely, sending it on its own")
+            group.append((identifier, text))
+            continue
+
+        logger.info(f"Splitting oversized entry {identifier} into {len(parts)} parts")
+        splits[identifier] = []
+        for part_number, (chunk, separator) in enumerate(parts, start=1):
+            part_identifier = f"{identifier}{PART_SUFFIX}{part_number}"
+            splits[identifier].append((part_identifier, separator))
+            group.append((part_identifier, chunk))
+
+    batches = []
+    batch = []
+    batch_input = 0
+    batch_output = 0
+    for _, group in page_groups:
+        costs = [entry_cost(identifier, text) for identifier, text in group]
+        group_input = sum(input_tokens for input_tokens, _ in costs)
+        group_output = sum(output_tokens for _, output_tokens in costs)
+        # Start a new batch for a page that fits into one batch, but not into the rest of this one
+        if (batch and len(group) <= batch_size and group_input <= max_input_tokens and group_output <= max_output_tokens
+                and (len(batch) + len(group) > batch_size
+                     or batch_input + group_input > max_input_tokens
+                     or batch_output + group_output > max_output_tokens)):
+            batches.append(batch)
+            batch = []
+            batch_input = 0
+            batch_output = 0
+
+        for (identifier, text), (input_tokens, output_tokens) in zip(group, costs):
+            if batch and (len(batch) >= batch_size
+                          or batch_input + input_tokens > max_input_tokens
+                          or batch_output + output_tokens > max_output_tokens):
+                batches.append(batch)
+                batch = []
+                batch_input = 0
+                batch_output = 0
+            batch.append((identifier, text))
+            batch_input += input_tokens
+            batch_output += output_tokens
+    if batch:
+        batches.append(batch)
+
+    return batches, splits
+
+def join_split_translations(translations, splits):
+    """
+    Reassemble the translations of split entries in place.
+    An entry is only reassembled if every one of its parts was translated.
+    """
+    for identifier, parts in splits.items():
+        if all(part_identifier in translations for part_identifier, _ in parts):
+            translations[identifier] = ''.join(
+                translations[part_identifier] + separator for part_identifier, separator in parts
+            )
+        for part_identifier, _ in parts:
+            translations.pop(part_identifier, None)
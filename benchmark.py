@@ -0,0 +1,126 @@
+import os
+import io
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from xml.sax.saxutils import escape
+from split import extract_translations
+from translate_with_openai import read_extracted_entries, translate_entries_async, write_translations, AdaptiveLimiter
+from merge import merge_translations
+from translation_backends import MockBackend
+
+WORDS = ("Der Algorithmus sortiert die Liste in Zeit und Speicher mit Vergleichen Beweis Lemma "
+         "Satz Knoten Kante Baum Graph Laufzeit Eingabe Ausgabe rekursiv optimal").split()
+LATEX_SNIPPETS = [r"$O(n \log n)$", r"\textbf{stabil}", r"$x_i \leq x_{i+1}$", r"\emph{Invariante}", r"$T(n) = 2T(n/2) + n$"]
+
+def generate_deck(filepath, pages=20, texts_per_page=30, words_per_text=12, seed=0):
+    """
+    Write a synthetic .ipe deck with German-looking texts and some LaTeX markup.
+    """
+    rng = random.Random(seed)
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0"?>\n<!DOCTYPE ipe SYSTEM "ipe.dtd">\n<ipe version="70218" creator="benchmark">\n')
+        f.write('<ipestyle name="basic">\n</ipestyle>\n')
+        for page in range(pages):
+            f.write('<page>\n<layer name="alpha"/>\n<view layers="alpha" active="alpha"/>\n')
+            for index in range(texts_per_page):
+                words = [rng.choice(WORDS) for _ in range(words_per_text)]
+                if rng.random() < 0.5:
+                    words.insert(rng.randrange(len(words) + 1), rng.choice(LATEX_SNIPPETS))
+                f.write(f'<text layer="alpha" pos="{64 + index} {700 - index * 20}" stroke="black" type="label" valign="baseline">{escape(" ".join(words))}</text>\n')
+            f.write('<path layer="alpha" stroke="black">\n64 64 m\n128 128 l\n</path>\n</page>\n')
+        f.write('</ipe>\n')
+
+def measure(stage):
+    """
+    Run `stage` quietly and return (result, wall time in seconds, peak traced memory in bytes).
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = stage()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def run_benchmark(pages=20, texts_per_page=30, words_per_text=12, batch_size=100, concurrency=4, latency=0.05, failure_rate=0.0, streaming=False, seed=0):
+    """
+    Generate a deck and run extraction, translation (against MockBackend) and merging.
+
+    Returns:
+        Dict with the deck parameters and, per stage, wall time, peak memory and counts
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        deck = os.path.join(directory, 'bench.ipe')
+        generate_deck(deck, pages, texts_per_page, words_per_text, seed)
+        backend = MockBackend(latency, failure_rate, seed)
+        client = backend.mock
+
+        extracted_file, extract_time, extract_memory = measure(lambda: extract_translations(deck, 10**9, streaming=streaming))
+
+        def translate():
+            entries = read_extracted_entries(extracted_file)
+            async def run():
+                async with backend:
+                    return await translate_entries_async(entries, backend, AdaptiveLimiter(concurrency), batch_size)
+            translations = asyncio.run(run())
+            return len(entries), write_translations(extracted_file, entries, translations)
+        (entry_count, translated_file), translate_time, translate_memory = measure(translate)
+
+        ipe_with_ids = deck.rsplit('.', 1)[0] + '_en.ipe'
+        _, merge_time, merge_memory = measure(lambda: merge_translations(ipe_with_ids, translated_file))
+        deck_size = os.path.getsize(deck)
+
+    total_tokens = client.prompt_tokens + client.completion_tokens
+    return {
+        "deck": {"pages": pages, "texts_per_page": texts_per_page, "words_per_text": words_per_text, "bytes": deck_size, "entries": entry_count},
+        "extract": {"seconds": extract_time, "peak_bytes": extract_memory},
+        "translate": {
+            "seconds": translate_time, "peak_bytes": translate_memory,
+            "requests": client.requests, "failed_requests": client.failures,
+            "prompt_tokens": client.prompt_tokens, "completion_tokens": client.completion_tokens,
+            "entries_per_second": entry_count / translate_time if translate_time else 0,
+            "tokens_per_second": total_tokens / translate_time if translate_time else 0,
+        },
+        "merge": {"seconds": merge_time, "peak_bytes": merge_memory},
+    }
+
+def print_report(result):
+    deck = result["deck"]
+    print(f"Deck: {deck['pages']} pages x {deck['texts_per_page']} texts x {deck['words_per_text']} words "
+          f"({deck['entries']} entries, {deck['bytes'] / 1e6:.1f} MB)")
+    print(f"{'Stage':<10} {'Wall time':>10} {'Peak memory':>12}")
+    for stage in ("extract", "translate", "merge"):
+        print(f"{stage:<10} {result[stage]['seconds']:>9.3f}s {result[stage]['peak_bytes'] / 1e6:>10.1f}MB")
+    translate = result["translate"]
+    print(f"Requests: {translate['requests']} ({translate['failed_requests']} rate limited)")
+    print(f"Tokens: {translate['prompt_tokens']} prompt, {translate['completion_tokens']} completion (estimated)")
+    print(f"Throughput: {translate['entries_per_second']:.0f} entries/s, {translate['tokens_per_second']:.0f} tokens/s")
+
+# Usage: python benchmark.py --pages 200 --latency 0.2 --failure-rate 0.05
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the translation pipeline offline against a mock backend.")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--texts-per-page", type=int, default=30)
+    parser.add_argument("--words-per-text", type=int, default=12)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="Mean seconds per mock request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability that a mock request is rate limited")
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming extraction")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.pages, args.texts_per_page, args.words_per_text, args.batch_size, args.concurrency,
+                           args.latency, args.failure_rate, args.streaming, args.seed)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# At most this many terms are put into the glossary of a deck (or range)
+GLOSSARY_SIZE = 60
+
+# A term has to occur in at least this many distinct texts to be put into the glossary
+MIN_TEXTS = 3
+
+# Shorter words are mostly articles, pronouns and other function words
+MIN_TERM_LENGTH = 4
+
+# Math, LaTeX commands and escaped characters, which never contain terms
+_LATEX_PATTERN = re.compile(r'\$[^$]*\$|\\[A-Za-z]+|\\.')
+# Words, including hyphenated compounds such as "Min-Heap"
+_WORD_PATTERN = re.compile(r'[^\W\d_]+(?:-[^\W\d_]+)*')
+# Capitalized words, the only candidates for terms
+_CAPITALIZED_PATTERN = re.compile(r'(?<![\w-])[A-ZÄÖÜ][^\W\d_]*(?:-[^\W\d_]+)*')
+# Characters skipped when looking for the end of the previous sentence before a word
+_SKIPPED_BEFORE_WORD = ' \t{}()[]*"\'-'
+_SENTENCE_ENDS = '.!?:;\n'
+
+def _starts_sentence(text, position):
+    """
+    Whether the word at `position` starts a sentence, a line or the whole text.
+    """
+    position -= 1
+    while position >= 0 and text[position] in _SKIPPED_BEFORE_WORD:
+        position -= 1
+    return position < 0 or text[position] in _SENTENCE_ENDS
+
+def find_terms(texts, max_terms=GLOSSARY_SIZE, min_texts=MIN_TEXTS):
+    """
+    Find the technical terms that recur in `texts`, without calling the model.
+
+    German nouns are capitalized, so capitalized words that do not start a sentence are
+    taken as terms. A term counts once per text it occurs in.
+
+    Returns:
+        The terms that occur in at least `min_texts` texts, most frequent first
+    """
+    counts = Counter()
+    for text in texts:
+        text = _LATEX_PATTERN.sub(' ', text)
+        terms = set()
+        for match in _CAPITALIZED_PATTERN.finditer(text):
+            word = match.group(0)
+            # Skip abbreviations such as "ALGO" and words that are capitalized because they start a sentence
+            if len(word) >= MIN_TERM_LENGTH and not word.isupper() and not _starts_sentence(text, match.start()):
+                terms.add(word)
+        counts.update(terms)
+    return [term for term, count in counts.most_common(max_terms) if count >= min_texts]
+
+def glossary_for_batch(glossary, batch):
+    """
+    The part of `glossary` (German term -> English translation) whose terms occur in the
+    (identifier, text) entries of `batch`, so a prompt only carries the terms it needs.
+    """
+    if not glossary:
+        return {}
+    words = set()
+    for _, text in batch:
+        words.update(_WORD_PATTERN.findall(text))
+    return {term: translation for term, translation in glossary.items() if term in words}
+
+def terms_match(terms, glossary):
+    """
+    Whether a translation made with the glossary `terms` can be reused with `glossary`: every
+    term that is also in `glossary` must still have the same translation. Terms that are not
+    in `glossary` (e.g. because it is the glossary of another deck) do not matter.
+    """
+    glossary = glossary or {}
+    return all(glossary.get(term, translation) == translation for term, translation in terms.items())
+
+def glossary_path_for(extracted_filepath):
+    """
+    Path of the glossary that belongs to an _extracted.txt file.
+    """
+    return extracted_filepath.rsplit('.', 1)[0] + '_glossary.json'
+
+def load_glossary(path, model, prompt_version):
+    """
+    Load a glossary written by save_glossary (and possibly edited by hand).
+
+    Returns:
+        Dict mapping German terms to English translations; empty if there is no glossary,
+        it cannot be read or it was written with a different model or prompt
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            glossary = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"WARNING: Could not read glossary {path} ({e}), building a new one")
+        return {}
+    if not isinstance(glossary, dict) or not isinstance(glossary.get("terms"), dict):
+        logger.warning(f"WARNING: {path} is not a glossary written by save_glossary, building a new one")
+        return {}
+    if glossary.get("model") != model or glossary.get("prompt_version") != prompt_version:
+        logger.info(f"Glossary {path} was written with a different model or prompt, building a new one")
+        return {}
+    return {term: translation for term, translation in glossary["terms"].items() if isinstance(translation, str) and translation.strip()}
+
+def save_glossary(path, glossary, model, prompt_version):
+    """
+    Save a glossary together with the model and prompt version it was translated with.
+    The terms are a JSON object mapping German terms to English translations, sorted by term,
+    so they can be reviewed and corrected by hand before the next run.
+    """
+    terms = dict(sorted(glossary.items()))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"model": model, "prompt_version": prompt_version, "terms": terms}, f, ensure_ascii=False, indent=1)
+    logger.info(f"Glossary with {len(glossary)} terms saved to: {path}")
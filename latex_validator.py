@@ -0,0 +1,102 @@
+import re
+from collections import Counter
+
+# Characters that LaTeX treats specially and that must be escaped in running text
+SPECIAL_CHARACTERS = '#%&_'
+
+# Commands that only encode German characters (e.g. \ss) and may legitimately disappear in a translation,
+# together with the empty group that often ends them (\ss{}e, \grqq{})
+IGNORED_COMMANDS = {'ss', 'glqq', 'grqq', 'glq', 'grq', 'flqq', 'frqq', 'dq'}
+
+# A command (\name), an escaped character (\x) or a structural/special character
+_TOKEN_PATTERN = re.compile(r'\\([A-Za-z]+)|\\(.)|([{}\[\]$#%&_])', re.DOTALL)
+
+def scan_latex(text):
+    """
+    Collect the structural LaTeX features of a text.
+
+    Returns a dict with:
+        counts: Counter of unescaped {, }, [, ], $ and special characters
+        commands: Counter of command names (\\frac -> "frac"), plus \\( \\) \\[ \\] math delimiters
+        double_dollars: number of $$ sequences
+        braces_ordered: False if a } ever closes more groups than were opened
+    """
+    counts = Counter()
+    commands = Counter()
+    depth = 0
+    braces_ordered = True
+    # End of an empty group that directly follows an ignored command
+    skip_until = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        if match.start() < skip_until:
+            continue
+        command, escaped, char = match.groups()
+        if command:
+            commands[command] += 1
+            if command in IGNORED_COMMANDS and text.startswith('{}', match.end()):
+                skip_until = match.end() + 2
+        elif escaped:
+            # Escaped single character such as \$, \# or \{; only \( \) \[ \] are structural
+            if escaped in '()[]':
+                commands[escaped] += 1
+        else:
+            counts[char] += 1
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+                if depth < 0:
+                    braces_ordered = False
+
+    for name in IGNORED_COMMANDS:
+        commands.pop(name, None)
+
+    return {
+        'counts': counts,
+        'commands': commands,
+        'double_dollars': text.count('$$') - text.count('\\$$'),
+        'braces_ordered': braces_ordered,
+    }
+
+def validate_translation(source, translation):
+    """
+    Compare a translation against its source text.
+
+    Checks balanced braces and brackets, math delimiters, doubled $$, the multiset of
+    LaTeX commands and unescaped special characters.
+
+    Returns:
+        List of problem descriptions; empty if the translation looks structurally sound
+    """
+    original = scan_latex(source)
+    translated = scan_latex(translation)
+    problems = []
+
+    for opening, closing, name in (('{', '}', 'braces'), ('[', ']', 'brackets')):
+        before = (original['counts'][opening], original['counts'][closing])
+        after = (translated['counts'][opening], translated['counts'][closing])
+        if before != after:
+            problems.append(f"{name}: expected {before[0]} {opening} and {before[1]} {closing}, found {after[0]} and {after[1]}")
+    if original['braces_ordered'] and not translated['braces_ordered']:
+        problems.append("braces: a } closes a group that was never opened")
+
+    if original['counts']['$'] != translated['counts']['$']:
+        problems.append(f"math: expected {original['counts']['$']} $, found {translated['counts']['$']}")
+    if translated['double_dollars'] > original['double_dollars']:
+        problems.append("math: doubled $$ that is not in the original")
+
+    if original['commands'] != translated['commands']:
+        missing = original['commands'] - translated['commands']
+        added = translated['commands'] - original['commands']
+        details = []
+        if missing:
+            details.append("missing " + ', '.join(f"\\{name}" for name in sorted(missing.elements())))
+        if added:
+            details.append("added " + ', '.join(f"\\{name}" for name in sorted(added.elements())))
+        problems.append("commands: " + '; '.join(details))
+
+    for char in SPECIAL_CHARACTERS:
+        if translated['counts'][char] > original['counts'][char]:
+            problems.append(f"unescaped {char} (write \\{char})")
+
+    return problems
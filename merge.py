@@ -1,8 +1,158 @@
 import xml.etree.ElementTree as ET
 import re
+import html
+import logging
+from xml.sax.saxutils import escape
+from run_report import timed_stage
 
-def merge_translations(ipe_filepath, translations_filepath):
-    print(f"Opening files:\n{ipe_filepath}\n{translations_filepath}")
+logger = logging.getLogger(__name__)
+
+# A <text> element whose whole content is an identifier
+_PLACEHOLDER_PATTERN = re.compile(r'(<text\b[^>]*>)\s*(TRANSLATE_[A-Za-z0-9]+)\s*(</text>)')
+
+# A <text> element with its (escaped) content
+_TEXT_PATTERN = re.compile(r'(<text\b[^>]*>)([^<]*)(</text>)')
+
+# Characters read from the .ipe file at a time by the streaming merge
+CHUNK_SIZE = 1 << 20
+
+def apply_translations(root, translations):
+    """
+    Replace the identifiers in the <text> elements of a parsed .ipe tree with their translations.
+    Returns the number of replaced elements.
+    """
+    replacements = 0
+    not_found = set()
+    for page in root.findall('.//page'):
+        for elem in page.findall('.//text'):
+            if elem.text and elem.text.strip():
+                identifier = elem.text.strip()
+                if identifier in translations:
+                    elem.text = translations[identifier]
+                    replacements += 1
+                else:
+                    not_found.add(identifier)
+    
+    if not_found:
+        identifiers = '\n'.join(f"  - {identifier}" for identifier in sorted(not_found))
+        logger.warning(f"\nWARNING: Could not find translations for these identifiers:\n{identifiers}")
+    
+    logger.info(f"\nReplaced {replacements} text elements")
+    return replacements
+
+def _mergeable_length(buffer):
+    """
+    Length of the prefix of `buffer` that can be merged now: everything before a <text>
+    element that is not closed yet, or before a "<text" that may be cut off at the end.
+    """
+    start = buffer.rfind('<text')
+    while start != -1:
+        if start + len('<text') == len(buffer):
+            # The tag name may continue in the next chunk
+            return start
+        if buffer[start + len('<text')] in ' \t\r\n/>':
+            if buffer.find('</text>', start) == -1:
+                return start
+            break
+        # Another element such as <textstyle>
+        start = buffer.rfind('<text', 0, start)
+    
+    # Hold back a "<", "<t", ... at the very end that may become "<text"
+    partial = buffer.rfind('<', max(0, len(buffer) - len('<text') + 1))
+    if partial != -1 and '<text'.startswith(buffer[partial:]):
+        return partial
+    return len(buffer)
+
+def merge_streaming(ipe_filepath, output_filepath, translations, chunk_size=CHUNK_SIZE):
+    """
+    Copy an ID-stamped .ipe file to `output_filepath`, replacing the identifiers in its
+    <text> elements with their XML-escaped translations. Everything else, including
+    comments, formatting and embedded bitmaps, is copied through unchanged. The file is
+    read in chunks, so memory use does not grow with the size of the deck.
+    Returns the number of replaced elements.
+    """
+    replacements = 0
+    not_found = set()
+    
+    def replace(match):
+        nonlocal replacements
+        start_tag, identifier, end_tag = match.groups()
+        if identifier not in translations:
+            not_found.add(identifier)
+            return match.group(0)
+        replacements += 1
+        return start_tag + escape(translations[identifier]) + end_tag
+    
+    _substitute_streaming(ipe_filepath, output_filepath, _PLACEHOLDER_PATTERN, replace, chunk_size)
+    
+    if not_found:
+        identifiers = '\n'.join(f"  - {identifier}" for identifier in sorted(not_found))
+        logger.warning(f"\nWARNING: Could not find translations for these identifiers:\n{identifiers}")
+    
+    logger.info(f"\nReplaced {replacements} text elements")
+    return replacements
+
+def merge_into_original(input_filepath, output_filepath, entries, translations, chunk_size=CHUNK_SIZE):
+    """
+    Copy an original .ipe file to `output_filepath`, replacing the content of its <text> elements
+    with their XML-escaped translations, without an ID-stamped copy of the deck.
+    
+    `entries` are the (identifier, original text) entries of split.stamp_identifiers, which come
+    in document order: every <text> element whose content is the text of the next entry gets that
+    entry's translation. Elements without translation, and everything else, are copied through
+    unchanged, and the file is read in chunks as in merge_streaming.
+    Returns the number of replaced elements.
+    """
+    replacements = 0
+    position = 0
+    
+    def replace(match):
+        nonlocal replacements, position
+        start_tag, content, end_tag = match.groups()
+        if position == len(entries) or html.unescape(content.replace('\r\n', '\n').replace('\r', '\n')) != entries[position][1]:
+            return match.group(0)
+        identifier = entries[position][0]
+        position += 1
+        if identifier not in translations:
+            return match.group(0)
+        replacements += 1
+        return start_tag + escape(translations[identifier]) + end_tag
+    
+    _substitute_streaming(input_filepath, output_filepath, _TEXT_PATTERN, replace, chunk_size)
+    
+    if position < len(entries):
+        logger.warning(f"\nWARNING: {len(entries) - position} texts were not found in {input_filepath} and stay untranslated")
+    logger.info(f"\nReplaced {replacements} text elements")
+    return replacements
+
+def _substitute_streaming(input_filepath, output_filepath, pattern, replace, chunk_size):
+    """
+    Copy a file, applying `pattern.sub(replace, ...)` to <text> elements, chunk by chunk.
+    A <text> element that is cut off at the end of a chunk waits for the next chunk.
+    """
+    # newline='' keeps line endings exactly as they are
+    with open(input_filepath, 'r', encoding='utf-8', newline='') as source, open(output_filepath, 'w', encoding='utf-8', newline='') as target:
+        buffer = ''
+        while chunk := source.read(chunk_size):
+            buffer += chunk
+            end = _mergeable_length(buffer)
+            target.write(pattern.sub(replace, buffer[:end]))
+            buffer = buffer[end:]
+        target.write(pattern.sub(replace, buffer))
+
+@timed_stage("merge")
+def merge_translations(ipe_filepath, translations_filepath, streaming=True):
+    """
+    Merge a _translated.txt file into the ID-stamped .ipe file and save it as <name>_merged.ipe.
+    
+    With `streaming=True` only the identifiers in <text> elements are replaced and all other
+    bytes are copied unchanged (see merge_streaming). Otherwise the file is parsed with
+    ElementTree and written again, which drops comments and normalizes the XML.
+    
+    Returns:
+        Path to the merged file
+    """
+    logger.info(f"Opening files:\n{ipe_filepath}\n{translations_filepath}")
     
     # Read translations file
     translations = {}
@@ -17,38 +167,21 @@ def merge_translations(ipe_filepath, translations_filepath):
             if translation.strip():
                 translations[identifier] = translation.strip()
             else:
-                print(f"WARNING: Empty translation for {identifier}")
-    
-    print(f"Loaded {len(translations)} translations")
+                logger.warning(f"WARNING: Empty translation for {identifier}")
     
-    # Parse the .ipe file
-    tree = ET.parse(ipe_filepath)
-    root = tree.getroot()
+    logger.info(f"Loaded {len(translations)} translations")
     
-    # Replace identifiers with translations
-    replacements = 0
-    not_found = set()
-    for page in root.findall('.//page'):
-        for elem in page.findall('.//text'):
-            if elem.text and elem.text.strip():
-                identifier = elem.text.strip()
-                if identifier in translations:
-                    elem.text = translations[identifier]
-                    replacements += 1
-                else:
-                    not_found.add(identifier)
-    
-    if not_found:
-        print("\nWARNING: Could not find translations for these identifiers:")
-        for identifier in sorted(not_found):
-            print(f"  - {identifier}")
-    
-    print(f"\nReplaced {replacements} text elements")
-    
-    # Save the merged file
     output_filepath = ipe_filepath.rsplit('.ipe', 1)[0] + '_merged.ipe'
-    tree.write(output_filepath, encoding='unicode', xml_declaration=True)
-    print(f"Merged file saved to: {output_filepath}")
+    if streaming:
+        merge_streaming(ipe_filepath, output_filepath, translations)
+    else:
+        # Parse the .ipe file
+        tree = ET.parse(ipe_filepath)
+        apply_translations(tree.getroot(), translations)
+        
+        # Save the merged file
+        tree.write(output_filepath, encoding='unicode', xml_declaration=True)
+    logger.info(f"Merged file saved to: {output_filepath}")
     
     return output_filepath
 
@@ -0,0 +1,124 @@
+import re
+import json
+import random
+import asyncio
+from openai import RateLimitError
+from batch_planner import estimate_tokens
+
+class MockChatClient:
+    """
+    Offline stand-in for AsyncOpenAI that answers chat completion requests locally.
+
+    Replies are JSON objects keyed by ID like those of the real model, with every text
+    prefixed by "EN ". Requests take `latency` seconds (with +-50% jitter) and fail with
+    a rate limit error with probability `failure_rate`. Requests and estimated tokens are
+    counted, so the client can be used for benchmarks.
+
+    The files and batches endpoints of the Batch API are stubbed as well: a submitted job
+    answers all of its requests in the background, and rate limited requests end up in
+    the job's error file.
+
+    Usage (through translation_backends.MockBackend):
+        translate_ipe_file("slides/slides01.ipe", backend=MockBackend(latency=0.2, failure_rate=0.05))
+    """
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.chat = _Namespace(completions=_Namespace(with_raw_response=_Namespace(create=self._create)))
+        self.files = _Namespace(create=self._create_file, content=self._file_content)
+        self.batches = _Namespace(create=self._create_batch, retrieve=self._retrieve_batch)
+        self._files = {}
+        self._jobs = {}
+
+    async def _create(self, model, messages, **kwargs):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency * (0.5 + self.random.random()))
+
+        if self.random.random() < self.failure_rate:
+            self.failures += 1
+            raise MockRateLimitError()
+
+        # The texts are the JSON object in the prompt
+        prompt = messages[-1]["content"]
+        texts = json.loads(re.search(r'^\{$[\s\S]*?^\}$', prompt, re.M).group(0))
+        reply = json.dumps({identifier: f"EN {text}" for identifier, text in texts.items()}, ensure_ascii=False)
+
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        completion_tokens = estimate_tokens(reply)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+        completion = _Namespace(
+            choices=[_Namespace(message=_Namespace(content=reply), finish_reason="stop")],
+            usage=_Namespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens),
+            model=model,
+        )
+        return _Namespace(headers={}, parse=lambda: completion)
+
+    async def _create_file(self, file, purpose):
+        file_id = f"file-{len(self._files) + 1}"
+        self._files[file_id] = file.read().decode('utf-8')
+        return _Namespace(id=file_id, purpose=purpose)
+
+    async def _file_content(self, file_id):
+        return _Namespace(text=self._files[file_id])
+
+    async def _create_batch(self, input_file_id, endpoint, completion_window, **kwargs):
+        batch_id = f"batch-{len(self._jobs) + 1}"
+        requests = [json.loads(line) for line in self._files[input_file_id].splitlines() if line.strip()]
+        job = _Namespace(id=batch_id, status="in_progress", output_file_id=None, error_file_id=None,
+                         request_counts=_Namespace(total=len(requests), completed=0, failed=0))
+        self._jobs[batch_id] = job
+        job.task = asyncio.create_task(self._run_batch(job, requests))
+        return job
+
+    async def _retrieve_batch(self, batch_id):
+        return self._jobs[batch_id]
+
+    async def close(self):
+        # Nothing to release; kept open so the counters survive the run
+        pass
+
+    async def _run_batch(self, job, requests):
+        outputs = []
+        errors = []
+        for request in requests:
+            try:
+                raw_response = await self._create(**request["body"])
+            except MockRateLimitError:
+                job.request_counts.failed += 1
+                errors.append({"custom_id": request["custom_id"], "response": None, "error": {"code": "rate_limit_exceeded", "message": "Mock rate limit"}})
+                continue
+            completion = raw_response.parse()
+            usage = {"prompt_tokens": completion.usage.prompt_tokens, "completion_tokens": completion.usage.completion_tokens, "total_tokens": completion.usage.total_tokens}
+            job.request_counts.completed += 1
+            body = {"choices": [{"message": {"role": "assistant", "content": completion.choices[0].message.content}}], "usage": usage}
+            outputs.append({"custom_id": request["custom_id"], "response": {"status_code": 200, "body": body}, "error": None})
+
+        for results, attribute in ((outputs, "output_file_id"), (errors, "error_file_id")):
+            if results:
+                file_id = f"file-{len(self._files) + 1}"
+                self._files[file_id] = '\n'.join(json.dumps(result) for result in results) + '\n'
+                setattr(job, attribute, file_id)
+        job.status = "completed"
+
+class MockRateLimitError(RateLimitError):
+    """
+    Rate limit error of the mock client; handled like a real 429 with a 10 ms retry-after.
+    """
+    def __init__(self):
+        Exception.__init__(self, "Mock rate limit")
+        self.message = "Mock rate limit"
+        self.status_code = 429
+        self.response = _Namespace(headers={"retry-after-ms": "10"})
+        self.body = None
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
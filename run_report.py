@@ -0,0 +1,173 @@
+import csv
+import sys
+import json
+import time
+import logging
+import asyncio
+import functools
+import contextlib
+from collections import Counter
+
+# Loggers of the pipeline modules; "__main__" covers the module that is run as a script
+PIPELINE_LOGGERS = ("__main__", "split", "merge", "translate_with_openai", "translate_workflow", "translation_cache",
+                    "translation_journal", "translation_manifest", "batch_planner", "batch_api", "glossary")
+
+# 0: warnings only, 1: progress of every stage and batch, 2: also full prompts and replies
+VERBOSITY_LEVELS = {0: logging.WARNING, 1: logging.INFO, 2: logging.DEBUG}
+
+# Columns of the per-request CSV report
+REQUEST_FIELDS = ["batch", "kind", "texts", "translated", "attempts", "rate_limits", "latency_seconds", "prompt_tokens", "completion_tokens", "status"]
+
+def configure_logging(verbosity=0):
+    """
+    Log the messages of the pipeline modules to stdout, at the detail given by `verbosity` (0, 1 or 2).
+    Other libraries (openai, httpx) only log warnings.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    level = VERBOSITY_LEVELS[max(0, min(verbosity, 2))]
+    for name in PIPELINE_LOGGERS:
+        pipeline_logger = logging.getLogger(name)
+        pipeline_logger.handlers = [handler]
+        pipeline_logger.setLevel(level)
+        pipeline_logger.propagate = False
+
+class RunReport:
+    """
+    Metrics of one run: time spent per stage, one row per API request (latency, retries,
+    token usage) and counters such as cache hits or fallbacks to the original text.
+
+    Stage times are summed over all decks, so in parallel mode they can exceed the wall time.
+    """
+    def __init__(self, settings=None):
+        self.settings = settings or {}
+        self.started = time.time()
+        self.stages = Counter()
+        self.requests = []
+        self.counters = Counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def record_request(self, batch, kind, texts, translated, attempts, rate_limits, latency, usage, status):
+        """
+        Record one API request (including its retries) of a batch.
+        `usage` is the usage of the API response (object or dict), or None if the request failed.
+        """
+        if isinstance(usage, dict):
+            prompt_tokens = usage.get('prompt_tokens') or 0
+            completion_tokens = usage.get('completion_tokens') or 0
+        else:
+            prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+            completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+        self.requests.append({
+            "batch": batch, "kind": kind, "texts": texts, "translated": translated,
+            "attempts": attempts, "rate_limits": rate_limits,
+            "latency_seconds": round(latency, 3) if latency is not None else None,
+            "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "status": status,
+        })
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the settings, stage times, totals and counters of the run
+        """
+        latencies = sorted(row["latency_seconds"] for row in self.requests if row["latency_seconds"] is not None)
+        return {
+            "settings": self.settings,
+            "wall_seconds": round(time.time() - self.started, 3),
+            "stage_seconds": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "requests": len(self.requests),
+            "failed_requests": sum(1 for row in self.requests if row["status"] == "failed"),
+            "retries": sum(row["attempts"] - 1 for row in self.requests),
+            "rate_limits": sum(row["rate_limits"] for row in self.requests),
+            "prompt_tokens": sum(row["prompt_tokens"] for row in self.requests),
+            "completion_tokens": sum(row["completion_tokens"] for row in self.requests),
+            "median_latency_seconds": latencies[len(latencies) // 2] if latencies else None,
+            "max_latency_seconds": latencies[-1] if latencies else None,
+            "counters": dict(self.counters),
+        }
+
+    def save(self, base_path):
+        """
+        Write <base_path>.json (summary and all requests) and <base_path>.csv (one row per request).
+
+        Returns:
+            Path to the JSON report
+        """
+        json_path = base_path + '.json'
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({**self.summary(), "request_details": self.requests}, f, indent=1)
+        with open(base_path + '.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REQUEST_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.requests)
+        return json_path
+
+    def print_summary(self, json_path=None):
+        summary = self.summary()
+        counters = summary["counters"]
+        stages = ', '.join(f"{name} {seconds:.1f}s" for name, seconds in summary["stage_seconds"].items())
+        print(f"Run finished in {summary['wall_seconds']:.1f}s ({stages})")
+        print(f"Requests: {summary['requests']} ({summary['retries']} retries, {summary['rate_limits']} rate limited, {summary['failed_requests']} failed), "
+              f"tokens: {summary['prompt_tokens']} prompt, {summary['completion_tokens']} completion")
+        print(f"Texts: {counters.get('entries', 0)} total, {counters.get('cache_hits', 0)} from cache, "
+              f"{counters.get('reused', 0)} reused, {counters.get('fallbacks', 0)} kept in German, {counters.get('invalid', 0)} with LaTeX problems")
+        if json_path:
+            print(f"Run report saved to: {json_path}")
+
+_current = RunReport()
+_active = False
+
+def current_report():
+    """
+    The report of the running run. Outside of a run, metrics go to a report that is never saved.
+    """
+    return _current
+
+@contextlib.contextmanager
+def reporting_run(base_path, verbosity=0, settings=None):
+    """
+    Collect the metrics of everything inside the `with` block into a new report, and save it
+    to <base_path>.json / .csv at the end. Nested runs (e.g. a deck of a range) add to the outer report.
+    """
+    global _current, _active
+    if _active:
+        yield _current
+        return
+
+    configure_logging(verbosity)
+    _current = RunReport(settings)
+    _active = True
+    try:
+        yield _current
+    finally:
+        _active = False
+        _current.print_summary(_current.save(base_path))
+
+def timed_stage(name):
+    """
+    Decorator that adds the run time of a function (or coroutine function) to stage `name` of the current report.
+    """
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with current_report().stage(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with current_report().stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
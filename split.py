@@ -1,68 +1,221 @@
+import os
 import xml.etree.ElementTree as ET
 import uuid
-import copy
+import io
+import json
+import hashlib
+import logging
+from run_report import timed_stage
 
-def extract_translations(input_filepath, max_elements=10):
-    print(f"Opening file: {input_filepath}")
-    print(f"Will extract up to {max_elements} elements")
+logger = logging.getLogger(__name__)
+
+def make_identifier(page_idx, layer, elem_idx, text):
+    """
+    Deterministic identifier of a text element, derived from its position (page, layer,
+    index on the page) and a hash of its content. The same deck always gets the same
+    identifiers, so translations can be matched between runs.
+    """
+    key = f"{page_idx}|{layer}|{elem_idx}|{text}"
+    return f"TRANSLATE_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]}"
+
+def _page_texts(page):
+    """
+    Yield (layer, element) for every <text> element of a page, in document order.
+    Objects without a layer attribute belong to the layer of the previous object, as in Ipe.
+    """
+    layer = ''
+    for child in page:
+        layer = child.get('layer', layer)
+        for elem in child.iter('text'):
+            yield layer, elem
+
+def _stamp_page_texts(page, page_idx, extracted_texts, text_count, max_elements):
+    """
+    Replace the text of every non-empty <text> element of a page with an identifier
+    and collect (identifier, text) entries.
+    Returns the updated text count; it ends up above max_elements once the limit is reached.
+    """
+    for elem_idx, (layer, elem) in enumerate(_page_texts(page)):
+        if elem.text and elem.text.strip():  # Check if it's a text element
+            text_count += 1
+            if text_count > max_elements:  # Skip if we've reached our limit
+                logger.info(f"\nReached maximum of {max_elements} elements. Stopping.")
+                break
+                
+            logger.debug(f"\nProcessing text element {text_count}:")
+            try:
+                # Generate identifier
+                identifier = make_identifier(page_idx, layer, elem_idx, elem.text)
+                
+                # Store the original text with its identifier
+                extracted_texts.append((identifier, elem.text))
+                
+                # Replace text with identifier in the modified XML
+                elem.text = identifier
+                
+            except Exception as e:
+                logger.error(f"Error processing text element: {e}")
+                continue
+    return text_count
+
+def stamp_identifiers(input_filepath, max_elements=10):
+    """
+    Parse an .ipe file (keeping comments) and replace its texts with identifiers in place.
     
-    # Parse the .ipe file as XML
+    Returns:
+        (tree, entries, pages): the modified ElementTree, a list of (identifier, original text)
+        and a dict mapping each identifier to its page number (starting at 1)
+    """
     parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
     tree = ET.parse(input_filepath, parser=parser)
     root = tree.getroot()
     
-    # Create a copy of the tree for the modified version
-    modified_tree = copy.deepcopy(tree)
-    modified_root = modified_tree.getroot()
-    
+    # Replace the texts in place, in a single pass over all pages
     text_count = 0
-    extracted_texts = []
+    entries = []
+    pages = {}
+    for page_idx, page in enumerate(root.iter('page')):
+        first_entry = len(entries)
+        text_count = _stamp_page_texts(page, page_idx, entries, text_count, max_elements)
+        pages.update((identifier, page_idx + 1) for identifier, _ in entries[first_entry:])
+        if text_count > max_elements:
+            break
+    return tree, entries, pages
+
+def pages_path_for(extracted_filepath):
+    """
+    Path of the file with the page numbers of the entries of an _extracted.txt file.
+    """
+    return extracted_filepath.rsplit('.', 1)[0] + '_pages.json'
+
+def read_pages(extracted_filepath):
+    """
+    Read the page numbers that extract_translations recorded for an _extracted.txt file.
     
-    # Find all text elements in the XML
-    for page_idx, page in enumerate(root.findall('.//page')):
-        modified_page = modified_root.findall('.//page')[page_idx]
-        
-        for elem_idx, elem in enumerate(page.findall('.//text')):
-            modified_elem = modified_page.findall('.//text')[elem_idx]
-            
-            if elem.text and elem.text.strip():  # Check if it's a text element
-                text_count += 1
-                if text_count > max_elements:  # Skip if we've reached our limit
-                    print(f"\nReached maximum of {max_elements} elements. Stopping.")
-                    break
-                    
-                print(f"\nProcessing text element {text_count}:")
-                try:
-                    # Generate identifier
-                    identifier = f"TRANSLATE_{str(uuid.uuid4())[:8]}"
-                    
-                    # Store the original text with its identifier using a special separator
-                    # Use "|||" as a separator instead of newline
-                    extracted_texts.append(f"{identifier}|||{elem.text}")
-                    
-                    # Replace text with identifier in the modified XML
-                    modified_elem.text = identifier
-                    
-                except Exception as e:
-                    print(f"Error processing text element: {e}")
-                    continue
+    Returns:
+        Dict mapping identifiers to page numbers, or None if the file was extracted without them
+    """
+    pages_path = pages_path_for(extracted_filepath)
+    if not os.path.exists(pages_path):
+        return None
+    with open(pages_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@timed_stage("extract")
+def extract_translations(input_filepath, max_elements=10, streaming=False):
+    """
+    Replace the texts of an .ipe file with identifiers.
+    
+    Writes the file with identifiers to <name>_en.ipe, the original texts to
+    <name>_extracted.txt and the page number of every text to <name>_extracted_pages.json,
+    and returns the path of the extracted texts.
+    
+    Args:
+        input_filepath: Path to the .ipe file
+        max_elements: Maximum number of text elements to extract
+        streaming: If True, process the file one top-level element at a time,
+            so memory use stays flat for very large files (same output)
+    """
+    logger.info(f"Opening file: {input_filepath}")
+    logger.info(f"Will extract up to {max_elements} elements")
     
-    # Save modified .ipe file with exact same format
     output_ipe = input_filepath.rsplit('.', 1)[0] + '_en.ipe'
-    modified_tree.write(output_ipe, encoding='unicode', xml_declaration=True)
-    print(f"Modified IPE file saved to: {output_ipe}")
+    if streaming:
+        extracted_texts, pages = _extract_streaming(input_filepath, output_ipe, max_elements)
+    else:
+        tree, extracted_texts, pages = stamp_identifiers(input_filepath, max_elements)
+        
+        # Save modified .ipe file with exact same format
+        tree.write(output_ipe, encoding='unicode', xml_declaration=True)
+    logger.info(f"Modified IPE file saved to: {output_ipe}")
     
     # Save extracted texts to a file
     extracted_filepath = input_filepath.rsplit('.', 1)[0] + '_extracted.txt'
     with open(extracted_filepath, 'w', encoding='utf-8') as f:
-        f.write('\n\n'.join(extracted_texts))
-    print(f"Extracted texts saved to: {extracted_filepath}")
+        # Use "|||" as a separator between identifier and text instead of newline
+        f.write('\n\n'.join(f"{identifier}|||{text}" for identifier, text in extracted_texts))
+    logger.info(f"Extracted texts saved to: {extracted_filepath}")
+    
+    # Save the page of every text, so batches can keep the texts of a slide together
+    with open(pages_path_for(extracted_filepath), 'w', encoding='utf-8') as f:
+        json.dump(pages, f)
     
     return extracted_filepath
 
+def _extract_streaming(input_filepath, output_ipe, max_elements):
+    """
+    Streaming variant of the extraction, based on iterparse.
+    
+    Every top-level element of <ipe> is written out and dropped from the tree as soon as
+    it has been parsed completely, so only one page is held in memory at a time.
+    Returns the list of extracted (identifier, text) entries and a dict mapping them to page numbers.
+    """
+    parser = ET.XMLParser(target=ET.TreeBuilder(insert_comments=True))
+    events = ET.iterparse(input_filepath, events=('start', 'end'), parser=parser)
+    
+    text_count = 0
+    page_idx = 0
+    extracted_texts = []
+    pages = {}
+    root = None
+    closing_tag = None
+    depth = 0
+    
+    with open(output_ipe, 'w', encoding='utf-8', errors='xmlcharrefreplace') as out:
+        def flush(up_to=None):
+            # Write (and drop) the finished children of the root, up to and including `up_to`
+            count = len(root) if up_to is None else list(root).index(up_to) + 1
+            for child in root[:count]:
+                out.write(ET.tostring(child, encoding='unicode'))
+            del root[:count]
+        
+        for event, elem in events:
+            if event == 'start':
+                depth += 1
+                if root is None:
+                    root = elem
+                continue
+            
+            depth -= 1
+            if depth == 1:
+                # A top-level element is complete
+                if closing_tag is None:
+                    closing_tag = _write_root_start(out, root)
+                if text_count <= max_elements:
+                    for page in elem.iter('page'):
+                        first_entry = len(extracted_texts)
+                        text_count = _stamp_page_texts(page, page_idx, extracted_texts, text_count, max_elements)
+                        page_idx += 1
+                        pages.update((identifier, page_idx) for identifier, _ in extracted_texts[first_entry:])
+                        if text_count > max_elements:
+                            break
+                flush(elem)
+            elif depth == 0:
+                if closing_tag is None:
+                    closing_tag = _write_root_start(out, root)
+                flush()
+                out.write(closing_tag)
+    
+    return extracted_texts, pages
+
+def _write_root_start(out, root):
+    """
+    Write the XML declaration and the start tag of the root exactly as ElementTree.write would.
+    Returns the matching closing tag.
+    """
+    marker = 'SPLIT_MARKER_' + uuid.uuid4().hex
+    shell = ET.Element(root.tag, root.attrib)
+    shell.text = root.text
+    ET.SubElement(shell, marker)
+    buffer = io.StringIO()
+    ET.ElementTree(shell).write(buffer, encoding='unicode', xml_declaration=True)
+    start, end = buffer.getvalue().split(f'<{marker} />')
+    out.write(start)
+    return end
+
 # Usage
 #filepath = "slides/test.ipe"
 #max_elements = 1000000  # Specify how many elements to extract
 #print("Starting extraction process...")
 #extract_translations(filepath, max_elements)
-#print("Extraction complete!")
\ No newline at end of file
+#print("Extraction complete!")
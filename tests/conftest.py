@@ -0,0 +1,44 @@
+import os
+import sys
+import pytest
+
+# The modules of the translator live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# A small deck with the things that tend to break extraction and merging: comments,
+# several pages and layers, multi-line texts, math, XML entities and non-text elements
+DECK = """<?xml version="1.0"?>
+<!DOCTYPE ipe SYSTEM "ipe.dtd">
+<ipe version="70218" creator="Ipe 7.2.24">
+<!-- generated for the tests -->
+<info created="D:20240101000000" modified="D:20240101000000"/>
+<preamble>\\usepackage{amsmath}</preamble>
+<page>
+<layer name="alpha"/>
+<layer name="beta"/>
+<view layers="alpha beta" active="alpha"/>
+<text layer="alpha" transformations="translations" pos="64 768" stroke="black" type="label" valign="baseline">Einführung in die Algorithmen</text>
+<path stroke="black">
+64 700 m
+200 700 l
+</path>
+<text layer="beta" pos="64 600" stroke="black" type="minipage" width="400" valign="top">Die Laufzeit ist $O(n \\log n)$ &amp; der Speicher $&lt; n$.
+Zweite Zeile mit Ümlauten.</text>
+<text pos="64 500" stroke="black" type="label">  </text>
+</page>
+<page>
+<layer name="alpha"/>
+<text layer="alpha" pos="64 768" stroke="black" type="label">Einführung in die Algorithmen</text>
+<text layer="alpha" pos="64 700" stroke="black" type="minipage" width="300">Ein Min-Heap speichert \\emph{Schlüssel} in einem Baum.</text>
+</page>
+</ipe>
+"""
+
+@pytest.fixture
+def deck_path(tmp_path):
+    """
+    Path of a copy of DECK in a temporary directory.
+    """
+    path = tmp_path / "slides01.ipe"
+    path.write_text(DECK, encoding='utf-8')
+    return str(path)
@@ -0,0 +1,36 @@
+import time
+from conftest import DECK
+from translation_backends import MockBackend
+from translate_with_openai import translate_entries
+from translate_workflow import translate_slides_range
+
+ENTRIES = [(f"TRANSLATE_{number}", f"Text Nummer {number}") for number in range(20)]
+
+def test_batch_api_job_against_the_mock_endpoints(tmp_path):
+    backend = MockBackend(seed=1)
+    translations = translate_entries(ENTRIES, 4, backend=backend, batch_requests_path=str(tmp_path / "requests.jsonl"), glossary=False)
+    assert translations == {identifier: f"EN {text}" for identifier, text in ENTRIES}
+    assert backend.mock.requests == 5
+
+def test_failed_batch_api_requests_are_translated_on_resume(tmp_path):
+    options = dict(batch_requests_path=str(tmp_path / "requests.jsonl"), journal_path=str(tmp_path / "journal.jsonl"), glossary=False)
+    backend = MockBackend(failure_rate=0.5, seed=3)
+    missing = len(ENTRIES) - len(translate_entries(ENTRIES, 2, backend=backend, **options))
+    assert backend.mock.failures > 0 and missing > 0
+
+    # Only the entries of the failed requests are submitted again
+    backend = MockBackend()
+    translations = translate_entries(ENTRIES, 2, backend=backend, resume=True, **options)
+    assert translations == {identifier: f"EN {text}" for identifier, text in ENTRIES}
+    assert backend.mock.requests == missing // 2
+
+def test_mock_batch_api_range_does_not_wait_for_the_poll_interval(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "slides").mkdir()
+    for slide_num in (1, 2):
+        (tmp_path / "slides" / f"slides{slide_num:02d}.ipe").write_text(DECK, encoding='utf-8')
+
+    start = time.perf_counter()
+    translate_slides_range(1, 2, batch_size=2, batch_api=True, backend="mock", cache_path=None)
+    assert time.perf_counter() - start < 10
+    assert "EN Einführung in die Algorithmen" in (tmp_path / "slides" / "slides02_en_merged.ipe").read_text(encoding='utf-8')
@@ -0,0 +1,39 @@
+import pytest
+from batch_planner import estimate_tokens, split_text, plan_batches, join_split_translations
+
+LONG_TEXT = '\n'.join(
+    f"Zeile {number}: Die Laufzeit von $\\sum_{{i=1}}^{{n}} i$ ist quadratisch. Das gilt auch für {{\\bf Heaps. Und Bäume.}}"
+    for number in range(40)
+)
+
+@pytest.mark.parametrize("max_tokens", [10, 50, 200, 10000])
+def test_split_text_round_trip(max_tokens):
+    parts = split_text(LONG_TEXT, max_tokens)
+    assert ''.join(chunk + separator for chunk, separator in parts) == LONG_TEXT
+    if max_tokens >= 50:
+        assert all(estimate_tokens(chunk) <= max_tokens for chunk, _ in parts)
+
+def test_split_text_never_cuts_math_or_braces():
+    for chunk, _ in split_text(LONG_TEXT, 10):
+        assert chunk.count('$') % 2 == 0
+        assert chunk.count('{') == chunk.count('}')
+
+def test_split_entries_are_joined_again():
+    entries = [("TRANSLATE_short", "Kurzer Text"), ("TRANSLATE_long", LONG_TEXT)]
+    batches, splits = plan_batches(entries, batch_size=3, max_input_tokens=400, max_output_tokens=800)
+    assert list(splits) == ["TRANSLATE_long"]
+    sent = [entry for batch in batches for entry in batch]
+    assert len(sent) == 1 + len(splits["TRANSLATE_long"])
+
+    # An identity "translation" of every part gives back the original text
+    translations = dict(sent)
+    join_split_translations(translations, splits)
+    assert translations == dict(entries)
+
+def test_split_entry_is_not_joined_with_a_missing_part():
+    entries = [("TRANSLATE_long", LONG_TEXT)]
+    batches, splits = plan_batches(entries, batch_size=100, max_input_tokens=400, max_output_tokens=800)
+    translations = dict(entry for batch in batches for entry in batch)
+    del translations[splits["TRANSLATE_long"][-1][0]]
+    join_split_translations(translations, splits)
+    assert translations == {}
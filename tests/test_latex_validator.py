@@ -0,0 +1,29 @@
+import pytest
+from latex_validator import validate_translation
+
+@pytest.mark.parametrize("source, translation", [
+    (r"Gro\ss{}e Zahl", "Large number"),
+    (r"Gro\ss e Zahl", "Large number"),
+    (r"\glqq{}Hallo\grqq{} sagt $x$", r"``Hello'' says $x$"),
+    (r"Der \glqq Baum\grqq{} mit {\bf Wurzel}", r"The ``tree'' with {\bf root}"),
+    (r"Die Laufzeit ist $O(n^{2})$.", r"The running time is $O(n^{2})$."),
+    (r"Kosten: 5\% und \#1", r"Cost: 5\% and \#1"),
+])
+def test_sound_translations_have_no_problems(source, translation):
+    assert validate_translation(source, translation) == []
+
+@pytest.mark.parametrize("source, translation, problem", [
+    (r"Die Laufzeit ist $O(n)$", r"The running time is $O(n)", "math: expected 2 $, found 1"),
+    (r"{\bf Wichtig}", r"{\bf Important}}", "braces: expected 1 { and 1 }, found 1 and 2"),
+    (r"\emph{a} und b", r"a and b", "braces: expected 1 { and 1 }, found 0 and 0"),
+    (r"Kosten: 5\%", r"Cost: 5%", "unescaped % (write \\%)"),
+    (r"$x$", r"$$x$$", "math: doubled $$ that is not in the original"),
+    (r"\frac{1}{2}", r"\dfrac{1}{2}", "commands: missing \\frac; added \\dfrac"),
+])
+def test_broken_translations_are_reported(source, translation, problem):
+    assert problem in validate_translation(source, translation)
+
+def test_empty_group_is_only_dropped_after_ignored_commands():
+    # \\ is a line break, so the group after it is real
+    assert validate_translation(r"a \\ss{}", r"a \\ss") == ["braces: expected 1 { and 1 }, found 0 and 0"]
+    assert validate_translation(r"\LaTeX{} ist gut", r"\LaTeX is good") == ["braces: expected 1 { and 1 }, found 0 and 0"]
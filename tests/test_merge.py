@@ -0,0 +1,76 @@
+import re
+import html
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+import pytest
+from conftest import DECK
+from split import extract_translations, stamp_identifiers
+from merge import apply_translations, merge_streaming, merge_into_original
+from translate_workflow import translate_ipe_file
+from translate_with_openai import read_extracted_entries
+
+@pytest.fixture
+def stamped_deck(deck_path):
+    """
+    The ID-stamped deck and translations for all of its texts, some of which need escaping.
+    """
+    extracted_filepath = extract_translations(deck_path, max_elements=1000)
+    translations = {identifier: f"EN <{number}> & {text}" for number, (identifier, text) in enumerate(read_extracted_entries(extracted_filepath))}
+    return deck_path.rsplit('.', 1)[0] + '_en.ipe', translations
+
+def _texts(path):
+    return [(elem.attrib, elem.text) for elem in ET.parse(path).getroot().iter('text')]
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_streaming_merge_matches_tree_merge(stamped_deck, tmp_path, chunk_size):
+    ipe_filepath, translations = stamped_deck
+    streamed_filepath = str(tmp_path / "streamed.ipe")
+    assert merge_streaming(ipe_filepath, streamed_filepath, translations, chunk_size=chunk_size) == len(translations)
+
+    tree = ET.parse(ipe_filepath)
+    assert apply_translations(tree.getroot(), translations) == len(translations)
+    tree_filepath = str(tmp_path / "tree.ipe")
+    tree.write(tree_filepath, encoding='unicode', xml_declaration=True)
+
+    assert _texts(streamed_filepath) == _texts(tree_filepath)
+
+def test_streaming_merge_only_changes_the_texts(stamped_deck, tmp_path):
+    ipe_filepath, translations = stamped_deck
+    merged_filepath = str(tmp_path / "merged.ipe")
+    merge_streaming(ipe_filepath, merged_filepath, translations, chunk_size=5)
+
+    with open(ipe_filepath, 'r', encoding='utf-8') as f:
+        expected = f.read()
+    for identifier, translation in translations.items():
+        escaped = translation.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        expected = expected.replace(f">{identifier}<", f">{escaped}<")
+    with open(merged_filepath, 'r', encoding='utf-8') as f:
+        assert f.read() == expected
+
+def _expected_merge(deck, translate):
+    # The original deck with the content of every non-empty <text> element replaced
+    def replace(match):
+        text = html.unescape(match.group(2))
+        if not text.strip():
+            return match.group(0)
+        return match.group(1) + escape(translate(text)) + match.group(3)
+    return re.sub(r'(<text\b[^>]*>)([^<]*)(</text>)', replace, deck)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 20])
+def test_merge_into_original_only_changes_the_texts(deck_path, tmp_path, chunk_size):
+    _, entries, _ = stamp_identifiers(deck_path, 1000)
+    translations = {identifier: f"EN <{text}>" for identifier, text in entries}
+    # An untranslated text stays as it is
+    del translations[entries[-1][0]]
+    merged_filepath = str(tmp_path / "merged.ipe")
+    assert merge_into_original(deck_path, merged_filepath, entries, translations, chunk_size=chunk_size) == len(entries) - 1
+
+    last_text = entries[-1][1]
+    expected = _expected_merge(DECK, lambda text: text if text == last_text else f"EN <{text}>")
+    with open(merged_filepath, 'r', encoding='utf-8') as f:
+        assert f.read() == expected
+
+def test_in_memory_workflow_keeps_the_deck_outside_of_the_texts(deck_path):
+    merged_filepath = translate_ipe_file(deck_path, backend="mock", cache_path=None)
+    with open(merged_filepath, 'r', encoding='utf-8') as f:
+        assert f.read() == _expected_merge(DECK, lambda text: f"EN {text.strip()}")
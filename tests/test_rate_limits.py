@@ -0,0 +1,107 @@
+import re
+import json
+import time
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from translation_backends import LocalBackend
+from translate_with_openai import AdaptiveLimiter, _translate_batch, translate_batches_async
+
+RETRY_AFTER_MS = 200
+
+class _FakeChatHandler(BaseHTTPRequestHandler):
+    """
+    Chat completions endpoint that rate limits the first `server.rate_limits` requests
+    and then answers like the model, prefixing every text with "EN ".
+    """
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.requests.append(time.monotonic())
+            rate_limited = self.server.rate_limits > 0
+            self.server.rate_limits -= rate_limited
+
+        if rate_limited:
+            status = 429
+            headers = {"retry-after-ms": str(RETRY_AFTER_MS)}
+            body = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+        else:
+            prompt = request["messages"][-1]["content"]
+            texts = json.loads(re.search(r'^\{$[\s\S]*?^\}$', prompt, re.M).group(0))
+            reply = json.dumps({identifier: f"EN {text}" for identifier, text in texts.items()}, ensure_ascii=False)
+            status = 200
+            headers = {"x-ratelimit-remaining-requests": "100"}
+            body = {
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": request["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 10, "total_tokens": 20},
+            }
+
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeChatHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.rate_limits = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _backend(server):
+    return LocalBackend("test-model", f"http://127.0.0.1:{server.server_address[1]}/v1")
+
+def test_rate_limited_batch_waits_for_retry_after_and_retries(fake_server):
+    fake_server.rate_limits = 1
+    batch = [("TRANSLATE_a", "Hallo"), ("TRANSLATE_b", "Welt")]
+
+    async def run():
+        limiter = AdaptiveLimiter(4)
+        async with _backend(fake_server) as backend:
+            translations = await _translate_batch(backend, batch, 1, limiter, max_retries=3)
+        return translations, limiter
+
+    translations, limiter = asyncio.run(run())
+    assert translations == {"TRANSLATE_a": "EN Hallo", "TRANSLATE_b": "EN Welt"}
+    # The client itself does not retry, so the server sees exactly one retry
+    assert len(fake_server.requests) == 2
+    assert fake_server.requests[1] - fake_server.requests[0] >= RETRY_AFTER_MS / 1000
+    # Halved by the rate limit, then one more request let in by the success
+    assert limiter.limit == 3
+
+def test_all_batches_are_translated_despite_rate_limits(fake_server):
+    fake_server.rate_limits = 3
+    batches = [[(f"TRANSLATE_{batch}x{text}", f"Text {batch}.{text}") for text in range(3)] for batch in range(6)]
+
+    async def run():
+        limiter = AdaptiveLimiter(4)
+        async with _backend(fake_server) as backend:
+            return await translate_batches_async(backend, batches, max_retries=5, limiter=limiter)
+
+    results = asyncio.run(run())
+    assert results == [{identifier: f"EN {text}" for identifier, text in batch} for batch in batches]
+    assert len(fake_server.requests) == len(batches) + 3
+
+def test_rate_limit_without_retries_gives_up(fake_server):
+    fake_server.rate_limits = 2
+
+    async def run():
+        async with _backend(fake_server) as backend:
+            return await _translate_batch(backend, [("TRANSLATE_a", "Hallo")], 1, AdaptiveLimiter(1), max_retries=1)
+
+    assert asyncio.run(run()) == {}
+    assert len(fake_server.requests) == 2
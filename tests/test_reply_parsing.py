@@ -0,0 +1,59 @@
+import json
+import asyncio
+from types import SimpleNamespace
+from translate_with_openai import parse_translation_reply, _translate_batch, AdaptiveLimiter
+
+IDS = ["TRANSLATE_a1", "TRANSLATE_b2", "TRANSLATE_c3"]
+
+def test_reply_keeps_only_requested_ids():
+    reply = json.dumps({
+        "TRANSLATE_a1": " Hello ",
+        "TRANSLATE_b2": "",
+        "TRANSLATE_zz": "Invented",
+        "translate_c3": "Reformatted",
+    })
+    assert parse_translation_reply(reply, IDS) == {"TRANSLATE_a1": "Hello"}
+
+def test_reply_in_a_code_block():
+    reply = "```json\n" + json.dumps({identifier: "Text" for identifier in IDS}) + "\n```"
+    assert parse_translation_reply(reply, IDS) == {identifier: "Text" for identifier in IDS}
+
+def test_reply_that_is_not_a_json_object():
+    assert parse_translation_reply("TRANSLATE_a1\nHello", IDS) == {}
+    assert parse_translation_reply(json.dumps(["Hello"]), IDS) == {}
+    assert parse_translation_reply(json.dumps({"TRANSLATE_a1": ["Hello"]}), IDS) == {}
+
+class _ScriptedBackend:
+    """
+    Backend whose client answers with the given replies in turn and remembers the requested texts.
+    """
+    model = "scripted"
+    temperature = 0
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+        self.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(with_raw_response=SimpleNamespace(create=self._create))))
+
+    async def _create(self, model, messages, **kwargs):
+        self.requests.append(messages[-1]["content"])
+        completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.replies.pop(0)))], usage=None)
+        return SimpleNamespace(headers={}, parse=lambda: completion)
+
+def test_missing_and_malformed_ids_are_requested_again_alone():
+    batch = [(identifier, f"Text {identifier}") for identifier in IDS]
+    backend = _ScriptedBackend([
+        json.dumps({"TRANSLATE_a1": "A", "TRANSLATE_b2 ": "B"}),
+        json.dumps({"TRANSLATE_b2": "B", "TRANSLATE_c3": "C"}),
+    ])
+    translations = asyncio.run(_translate_batch(backend, batch, 1, AdaptiveLimiter(1), max_retries=0))
+    assert translations == {"TRANSLATE_a1": "A", "TRANSLATE_b2": "B", "TRANSLATE_c3": "C"}
+    # The follow-up request only carries the two missing texts
+    assert "TRANSLATE_a1" not in backend.requests[1]
+    assert "TRANSLATE_b2" in backend.requests[1] and "TRANSLATE_c3" in backend.requests[1]
+
+def test_follow_up_requests_stop_after_missing_id_retries():
+    backend = _ScriptedBackend([json.dumps({"TRANSLATE_a1": "A"})] * 3)
+    translations = asyncio.run(_translate_batch(backend, [(IDS[0], "a"), (IDS[1], "b")], 1, AdaptiveLimiter(1), max_retries=0, missing_id_retries=2))
+    assert translations == {"TRANSLATE_a1": "A"}
+    assert len(backend.requests) == 3
@@ -0,0 +1,33 @@
+import os
+import shutil
+from split import extract_translations, read_pages
+
+def _extract(deck_path, directory, streaming):
+    os.makedirs(directory)
+    input_filepath = os.path.join(directory, "slides01.ipe")
+    shutil.copy(deck_path, input_filepath)
+    extracted_filepath = extract_translations(input_filepath, max_elements=1000, streaming=streaming)
+    outputs = {}
+    for path in (input_filepath.rsplit('.', 1)[0] + '_en.ipe', extracted_filepath):
+        with open(path, 'r', encoding='utf-8') as f:
+            outputs[os.path.basename(path)] = f.read()
+    outputs["pages"] = read_pages(extracted_filepath)
+    return outputs
+
+def test_streaming_extraction_matches_tree_extraction(deck_path, tmp_path):
+    in_memory = _extract(deck_path, str(tmp_path / "tree"), streaming=False)
+    streamed = _extract(deck_path, str(tmp_path / "streaming"), streaming=True)
+    assert streamed == in_memory
+
+def test_extraction_skips_empty_texts_and_numbers_pages(deck_path, tmp_path):
+    outputs = _extract(deck_path, str(tmp_path / "tree"), streaming=False)
+    entries = [block.split('|||', 1) for block in outputs["slides01_extracted.txt"].split('\n\n')]
+    assert [text for _, text in entries] == [
+        "Einführung in die Algorithmen",
+        "Die Laufzeit ist $O(n \\log n)$ & der Speicher $< n$.\nZweite Zeile mit Ümlauten.",
+        "Einführung in die Algorithmen",
+        "Ein Min-Heap speichert \\emph{Schlüssel} in einem Baum.",
+    ]
+    assert [outputs["pages"][identifier] for identifier, _ in entries] == [1, 1, 2, 2]
+    # The same text on two pages gets two identifiers
+    assert entries[0][0] != entries[2][0]
@@ -0,0 +1,50 @@
+from translation_cache import TranslationCache
+
+def test_changed_glossary_term_misses_but_missing_term_hits(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), "model", "v1")
+    cache.put_many([("Die Laufzeit ist linear.", "The running time is linear."), ("Vorlesung Algorithmen", "Lecture Algorithms")],
+                   {"Laufzeit": "running time", "Algorithmen": "Algorithms"})
+
+    texts = ["Die Laufzeit ist linear.", "Vorlesung Algorithmen"]
+    # Same translations, or terms the glossary of this deck does not have
+    assert cache.get_many(texts, {"Laufzeit": "running time"}) == dict(zip(texts, ["The running time is linear.", "Lecture Algorithms"]))
+    assert len(cache.get_many(texts)) == 2
+    # An edited term only misses the texts that were translated with it
+    assert cache.get_many(texts, {"Laufzeit": "runtime", "Algorithmen": "Algorithms"}) == {"Vorlesung Algorithmen": "Lecture Algorithms"}
+    cache.close()
+
+def test_hits_are_shared_between_decks_and_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with TranslationCache(path, "model", "v1") as cache:
+        cache.put_many([("Vorlesung Algorithmen", "Lecture Algorithms")])
+        assert cache.get_many(["Vorlesung Algorithmen", "Neuer Text"]) == {"Vorlesung Algorithmen": "Lecture Algorithms"}
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    with TranslationCache(path, "model", "v1") as cache:
+        # Whitespace-only differences hit the same entry
+        assert cache.get_many(["  Vorlesung Algorithmen \r\n"]) == {"  Vorlesung Algorithmen \r\n": "Lecture Algorithms"}
+
+def test_model_and_prompt_version_are_part_of_the_key(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with TranslationCache(path, "model", "v1") as cache:
+        cache.put_many([("Baum", "tree")])
+    for model, prompt_version in (("other-model", "v1"), ("model", "v2")):
+        with TranslationCache(path, model, prompt_version) as cache:
+            assert cache.get_many(["Baum"]) == {}
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), "model", "v1", max_entries=2)
+    for text in ("Eins", "Zwei", "Drei"):
+        cache.put_many([(text, text.upper())])
+        # Make the order of use unambiguous
+        cache.connection.execute("UPDATE translations SET last_used = last_used - 10")
+    cache.get_many(["Eins"])
+    assert cache.evict() == 1
+    assert cache.get_many(["Eins", "Zwei", "Drei"]) == {"Eins": "EINS", "Drei": "DREI"}
+
+def test_entries_unused_for_too_long_are_evicted(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite"), "model", "v1", max_age_days=30)
+    cache.put_many([("Alt", "old"), ("Neu", "new")])
+    cache.connection.execute("UPDATE translations SET last_used = last_used - 31 * 86400 WHERE source = 'Alt'")
+    assert cache.evict() == 1
+    assert len(cache) == 1
@@ -0,0 +1,41 @@
+from translation_backends import MockBackend
+from translate_with_openai import translate_entries
+
+LONG_TEXT = '\n'.join(f"Zeile {number}: Die Laufzeit dieses Algorithmus ist quadratisch in der Eingabe." for number in range(30))
+ENTRIES = [("TRANSLATE_long", LONG_TEXT)] + [(f"TRANSLATE_{number}", f"Kurzer Text {number}") for number in range(6)]
+# Small enough to split the long text into several parts
+OPTIONS = dict(max_input_tokens=300, max_output_tokens=600, glossary=False)
+
+def test_resume_reuses_finished_entries_including_split_ones(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    backend = MockBackend()
+    translations = translate_entries(ENTRIES, 1, backend=backend, journal_path=journal_path, **OPTIONS)
+    assert len(translations) == len(ENTRIES)
+    # The long text was sent in several parts
+    assert backend.mock.requests > len(ENTRIES)
+
+    backend = MockBackend()
+    assert translate_entries(ENTRIES, 1, backend=backend, journal_path=journal_path, resume=True, **OPTIONS) == translations
+    assert backend.mock.requests == 0
+
+def test_resume_only_translates_what_an_interrupted_run_left(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    backend = MockBackend()
+    expected = translate_entries(ENTRIES, 1, backend=backend, **OPTIONS)
+    long_parts = backend.mock.requests - (len(ENTRIES) - 1)
+    backend = MockBackend(failure_rate=0.4, seed=2)
+    first = translate_entries(ENTRIES, 1, backend=backend, journal_path=journal_path, max_retries=0, **OPTIONS)
+    assert 0 < len(first) < len(ENTRIES)
+
+    # Only the entries without translation are sent again (an unfinished split entry with all of its parts)
+    missing = [identifier for identifier, _ in ENTRIES if identifier not in first]
+    backend = MockBackend()
+    assert translate_entries(ENTRIES, 1, backend=backend, journal_path=journal_path, resume=True, **OPTIONS) == expected
+    assert backend.mock.requests == sum(long_parts if identifier == "TRANSLATE_long" else 1 for identifier in missing)
+
+def test_without_resume_the_journal_starts_over(tmp_path):
+    journal_path = str(tmp_path / "journal.jsonl")
+    translate_entries(ENTRIES[1:], 1, backend=MockBackend(), journal_path=journal_path, **OPTIONS)
+    backend = MockBackend()
+    translate_entries(ENTRIES[1:], 1, backend=backend, journal_path=journal_path, **OPTIONS)
+    assert backend.mock.requests == len(ENTRIES) - 1
@@ -0,0 +1,33 @@
+from translation_manifest import save_manifest, load_manifest, diff_against_manifest
+
+PREVIOUS = [("TRANSLATE_1", "Titel"), ("TRANSLATE_2", "Die Laufzeit ist linear."), ("TRANSLATE_3", "Alter Text"), ("TRANSLATE_4", "Verschoben")]
+TRANSLATIONS = {"TRANSLATE_1": "Title", "TRANSLATE_2": "The running time is linear.", "TRANSLATE_3": "Old text", "TRANSLATE_4": "Moved"}
+
+def _manifest(tmp_path, glossary=None, translations=TRANSLATIONS):
+    path = str(tmp_path / "manifest.json")
+    save_manifest(path, PREVIOUS, translations, "model", "v1", glossary)
+    return load_manifest(path, "model", "v1")
+
+def test_unchanged_and_moved_entries_are_reused(tmp_path):
+    current = [("TRANSLATE_1", "Titel "), ("TRANSLATE_2", "Die Laufzeit ist linear."), ("TRANSLATE_3", "Neuer Text"), ("TRANSLATE_9", "Verschoben")]
+    assert diff_against_manifest(current, _manifest(tmp_path)) == {
+        "TRANSLATE_1": "Title", "TRANSLATE_2": "The running time is linear.", "TRANSLATE_9": "Moved",
+    }
+
+def test_manifest_of_another_model_or_prompt_is_ignored(tmp_path):
+    _manifest(tmp_path)
+    path = str(tmp_path / "manifest.json")
+    assert load_manifest(path, "other-model", "v1") == {}
+    assert load_manifest(path, "model", "v2") == {}
+    assert load_manifest(str(tmp_path / "missing.json"), "model", "v1") == {}
+
+def test_broken_translations_are_not_stored(tmp_path):
+    manifest = _manifest(tmp_path, translations={**TRANSLATIONS, "TRANSLATE_1": "Title}"})
+    assert "TRANSLATE_1" not in manifest
+    assert diff_against_manifest(PREVIOUS, manifest).keys() == {"TRANSLATE_2", "TRANSLATE_3", "TRANSLATE_4"}
+
+def test_entries_with_an_edited_glossary_term_are_translated_again(tmp_path):
+    manifest = _manifest(tmp_path, glossary={"Laufzeit": "running time"})
+    assert "TRANSLATE_2" in diff_against_manifest(PREVIOUS, manifest, {"Laufzeit": "running time"})
+    assert "TRANSLATE_2" in diff_against_manifest(PREVIOUS, manifest, {})
+    assert diff_against_manifest(PREVIOUS, manifest, {"Laufzeit": "runtime"}).keys() == {"TRANSLATE_1", "TRANSLATE_3", "TRANSLATE_4"}
@@ -1,8 +1,23 @@
-import os
-import time
-import json
 import re
-from openai import OpenAI
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from openai import RateLimitError, APIConnectionError, APITimeoutError, InternalServerError
+from translation_cache import TranslationCache, normalize_text
+from translation_journal import TranslationJournal
+from latex_validator import validate_translation
+from translation_manifest import manifest_path_for, load_manifest, save_manifest, diff_against_manifest
+from batch_planner import plan_batches, join_split_translations, MAX_INPUT_TOKENS, MAX_OUTPUT_TOKENS
+from run_report import current_report, timed_stage
+from batch_api import batch_requests_path_for, write_batch_requests, submit_batch_requests, wait_for_batch, download_batch_replies, finish_batch_job
+from translation_backends import MODEL, TEMPERATURE, create_backend
+from glossary import find_terms, glossary_for_batch, glossary_path_for, load_glossary, save_glossary
+from split import read_pages
+
+logger = logging.getLogger(__name__)
 
 def generate_mock_translation(text, identifier):
     """
@@ -11,29 +26,348 @@ def generate_mock_translation(text, identifier):
     """
     return f"[DEBUG MOCK TRANSLATION] {text}"
 
-def translate_with_openai(extracted_filepath, batch_size=1, api_key=None, debug_mode=False):
+# All fixed instructions are in the system message, so the user message of a batch only carries its texts
+SYSTEM_MESSAGE = (
+    "You are a professional translator specializing in academic and technical content. Translate German lecture slides to English. "
+    "Preserve all LaTeX commands and formatting exactly as they appear in the original text. Do not add or remove any $ symbols under any circumstances, "
+    "even if this results in incorrect or unusual LaTeX syntax; check this carefully, especially around $ delimiters. "
+    "Keep all LaTeX commands, braces {}, brackets [] and parentheses () exactly as in the original, and close every { that is opened. "
+    "Escape LaTeX special characters (e.g., #, %, _) where necessary, even in plain text. Do not make a translation longer than its original.\n\n"
+    "The texts are given as a JSON object that maps each ID to a German text, in slide order, so neighbouring texts usually belong to the same slide "
+    "and can be used as context. Reply with a JSON object that maps every ID, kept exactly as provided, to the English translation of its text, and nothing else. "
+    "Use the English terms of the glossary, if one is given."
+)
+
+# Entries with LaTeX problems are re-translated in batches of this size
+RETRY_BATCH_SIZE = 5
+
+# How often IDs that are missing or malformed in a reply are requested again
+MISSING_ID_RETRIES = 2
+
+def build_prompt(batch, feedback=None, glossary=None):
     """
-    Translate the extracted text using OpenAI's API and save to a new file.
+    Build the user prompt for a batch of (identifier, text) entries.
+    The texts are passed as a JSON object keyed by ID, and the reply is requested in the same form.
+    `feedback` optionally maps identifiers to the problems of an earlier translation.
+    `glossary` optionally maps German terms to English translations; only the terms that occur in the batch are included.
+    """
+    prompt = ""
     
-    Args:
-        extracted_filepath: Path to the file with extracted text
-        batch_size: Number of entries to batch in a single API request
-        api_key: OpenAI API key (if None, will try to get from environment variable)
-        debug_mode: If True, will print API requests without actually sending them
+    # Fix the translation of recurring terms
+    terms = glossary_for_batch(glossary, batch)
+    if terms:
+        prompt += "Glossary:\n" + '\n'.join(f"{term}: {translation}" for term, translation in terms.items()) + "\n\n"
+    
+    # Point out what was wrong with earlier translations of these texts
+    notes = [f"{identifier}: {'; '.join(feedback[identifier])}" for identifier, _ in batch if feedback and identifier in feedback]
+    if notes:
+        prompt += "Earlier translations of these texts broke the LaTeX structure. Avoid these problems:\n" + '\n'.join(notes) + "\n\n"
+    
+    # Add the texts as a JSON object mapping each ID to its text
+    prompt += "Texts:\n" + json.dumps(dict(batch), ensure_ascii=False, indent=1)
+    return prompt
+
+def build_request(batch, feedback=None, model=MODEL, temperature=TEMPERATURE, glossary=None):
     """
-    # Set up OpenAI client (only if not in debug mode)
-    if not debug_mode:
-        if api_key is None:
-            api_key = os.environ.get("OPENAI_API_KEY")
-        
-        if not api_key:
-            raise ValueError("OpenAI API key is required. Either pass it as an argument or set OPENAI_API_KEY environment variable.")
-        
-        client = OpenAI(api_key=api_key)
-    else:
-        print("=== RUNNING IN DEBUG MODE - NO API CALLS WILL BE MADE ===")
-        client = None
+    Build the chat completion request (model, messages, temperature, JSON reply format) for a batch.
+    """
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": build_prompt(batch, feedback, glossary)}
+        ],
+        "temperature": temperature,
+        "response_format": {"type": "json_object"}
+    }
+
+# Changes whenever the instructions change, so that cached translations from an old prompt are not reused
+PROMPT_VERSION = hashlib.sha256((SYSTEM_MESSAGE + build_prompt([])).encode('utf-8')).hexdigest()[:12]
+
+def parse_translation_reply(translation_text, requested_ids):
+    """
+    Parse a JSON reply that maps identifiers to translations.
+    
+    Only requested identifiers with a non-empty string translation are kept, so IDs the model
+    invented, reformatted or left out are simply missing. A reply that is not a JSON object
+    yields an empty dict.
+    """
+    text = translation_text.strip()
+    # Some models wrap the JSON in a markdown code block
+    fence = re.match(r'^```(?:json)?\s*([\s\S]*?)\s*```$', text)
+    if fence:
+        text = fence.group(1)
+    try:
+        reply = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(reply, dict):
+        return {}
+    
+    translations = {}
+    for identifier in requested_ids:
+        translation = reply.get(identifier)
+        if isinstance(translation, str) and translation.strip():
+            translations[identifier] = translation.strip()
+    return translations
+
+def _parse_reset_duration(value):
+    """
+    Parse a rate-limit reset header such as "1s", "6m0s", "20ms" or "0.5" into seconds.
+    Returns None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts or ''.join(n + u for n, u in parts) != value:
+        return None
+    factors = {'h': 3600, 'm': 60, 's': 1, 'ms': 0.001}
+    return sum(float(number) * factors[unit] for number, unit in parts)
+
+def _retry_after_seconds(headers):
+    """
+    Read how long the server wants us to wait from the response headers, if it says so.
+    """
+    if headers is None:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = _parse_reset_duration(headers.get(name))
+        if seconds is not None:
+            return seconds
+    return None
+
+class AdaptiveLimiter:
+    """
+    Keeps at most `limit` requests in flight and adapts that limit to the server.
+    
+    Every rate limit halves the number of concurrent requests and pauses all workers
+    until the reset time the server reported; every successful request lets one more
+    request in again, up to `max_concurrency`.
+    """
+    def __init__(self, max_concurrency):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self._condition = asyncio.Condition()
+    
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        # Respect a shared cooldown set by a rate limit on any worker
+        delay = self.resume_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
     
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+    
+    async def on_success(self, headers=None):
+        async with self._condition:
+            if self.limit < self.max_concurrency:
+                self.limit += 1
+                self._condition.notify_all()
+        # Pause proactively if the server says the request budget is used up
+        if headers is not None and headers.get("x-ratelimit-remaining-requests") == "0":
+            self.pause(_retry_after_seconds(headers) or 1.0)
+    
+    async def on_rate_limit(self, delay):
+        async with self._condition:
+            self.limit = max(1, self.limit // 2)
+        self.pause(delay)
+    
+    def pause(self, delay):
+        resume_at = asyncio.get_running_loop().time() + delay
+        self.resume_at = max(self.resume_at, resume_at)
+
+async def _translate_batch(backend, batch, batch_number, limiter, max_retries, feedback=None, missing_id_retries=MISSING_ID_RETRIES, glossary=None, kind=None):
+    """
+    Send one batch to the backend, retrying rate limits and transient errors.
+    IDs that are missing or malformed in the reply are requested again in a follow-up
+    request with only those texts, up to `missing_id_retries` times.
+    Every request is recorded in the run report, with its latency, retries and token usage.
+    Returns a dict mapping the identifiers of this batch to their translations.
+    """
+    if kind is None and missing_id_retries < MISSING_ID_RETRIES:
+        kind = "follow-up"
+    elif kind is None:
+        kind = "validation" if feedback else "batch"
+    request = build_request(batch, feedback, backend.model, backend.temperature, glossary)
+    rate_limits = 0
+    for attempt in range(max_retries + 1):
+        await limiter.acquire()
+        try:
+            logger.info(f"Sending batch {batch_number} to API with {len(batch)} texts")
+            start = time.perf_counter()
+            raw_response = await backend.client.chat.completions.with_raw_response.create(**request)
+            response = raw_response.parse()
+            latency = time.perf_counter() - start
+            await limiter.on_success(raw_response.headers)
+            break
+        except (RateLimitError, APIConnectionError, APITimeoutError, InternalServerError) as e:
+            headers = getattr(getattr(e, 'response', None), 'headers', None)
+            delay = _retry_after_seconds(headers)
+            if delay is None:
+                # Exponential backoff with jitter when the server gives no hint
+                delay = min(60, 2 ** attempt) * (0.5 + random.random())
+            if isinstance(e, RateLimitError):
+                rate_limits += 1
+                await limiter.on_rate_limit(delay)
+            if attempt == max_retries:
+                logger.error(f"Error processing batch {batch_number}: {e}")
+                current_report().record_request(batch_number, kind, len(batch), 0, attempt + 1, rate_limits, None, None, "failed")
+                return {}
+            logger.info(f"Batch {batch_number}: {type(e).__name__}, retrying in {delay:.1f}s (attempt {attempt + 1}/{max_retries})")
+            if not isinstance(e, RateLimitError):
+                await asyncio.sleep(delay)
+        except Exception as e:
+            logger.error(f"Error processing batch {batch_number}: {e}")
+            current_report().record_request(batch_number, kind, len(batch), 0, attempt + 1, rate_limits, None, None, "failed")
+            # The caller falls back to the original texts
+            return {}
+        finally:
+            await limiter.release()
+    
+    translation_text = response.choices[0].message.content.strip()
+    logger.debug(f"\n=== CHATGPT REPLY (BATCH {batch_number}) ===")
+    logger.debug(translation_text)
+    logger.debug("=== END REPLY ===\n")
+    
+    translations = parse_translation_reply(translation_text, [identifier for identifier, _ in batch])
+    
+    # Ask again for the texts whose translation is missing, instead of redoing the whole batch
+    missing = [(identifier, text) for identifier, text in batch if identifier not in translations]
+    current_report().record_request(batch_number, kind, len(batch), len(translations), attempt + 1, rate_limits, latency, getattr(response, 'usage', None), "partial" if missing else "ok")
+    if missing and missing_id_retries > 0:
+        logger.info(f"Batch {batch_number}: {len(missing)} of {len(batch)} IDs missing or malformed in the reply, requesting them again")
+        translations.update(await _translate_batch(backend, missing, batch_number, limiter, max_retries, feedback, missing_id_retries - 1, glossary))
+    return translations
+
+async def translate_batches_async(backend, batches, concurrency=4, max_retries=5, on_batch_done=None, limiter=None, feedback=None, glossary=None):
+    """
+    Translate all batches with up to `concurrency` requests in flight
+    (or as many as the shared `limiter` allows, if one is given).
+    Returns one dict per batch (in the order of `batches`) mapping identifiers to translations;
+    identifiers whose translation failed are missing from the dict.
+    `on_batch_done` is called with each batch's dict as soon as that batch completes.
+    `feedback` optionally maps identifiers to problems of earlier translations, and `glossary`
+    German terms to their translations (see build_prompt).
+    """
+    if limiter is None:
+        limiter = AdaptiveLimiter(concurrency)
+    
+    async def run_batch(batch, batch_number):
+        batch_translations = await _translate_batch(backend, batch, batch_number, limiter, max_retries, feedback, glossary=glossary)
+        if on_batch_done is not None:
+            on_batch_done(batch_translations)
+        return batch_translations
+    
+    tasks = [run_batch(batch, batch_number) for batch_number, batch in enumerate(batches, start=1)]
+    return await asyncio.gather(*tasks)
+
+async def translate_batches_with_batch_api(backend, batches, requests_path, resume=False, on_batch_done=None, limiter=None, max_retries=5, glossary=None, poll_interval=None):
+    """
+    Translate all batches with one job of the OpenAI Batch API instead of one request per batch.
+    The Batch API is cheaper and has separate rate limits, but can take up to 24 hours.
+    
+    The requests are written to `requests_path` (JSONL), uploaded and submitted, and the job
+    is polled until it is finished. Replies are mapped back by their TRANSLATE_ IDs.
+    IDs that are missing or malformed in the replies are requested again with the normal API
+    (sharing `limiter`, if one is given).
+    With `resume=True` the job of an interrupted run is picked up again.
+    The job is polled every `poll_interval` seconds (default: batch_api.POLL_INTERVAL).
+    Returns one dict per batch, like translate_batches_async.
+    """
+    write_batch_requests(requests_path, [build_request(batch, model=backend.model, temperature=backend.temperature, glossary=glossary) for batch in batches])
+    batch_id = await submit_batch_requests(backend.client, requests_path, resume)
+    job = await wait_for_batch(backend.client, batch_id, poll_interval)
+    if job.status != "completed":
+        logger.warning(f"Batch job {batch_id} ended with status {job.status}")
+    replies = await download_batch_replies(backend.client, job)
+    
+    # A resumed job may have been submitted with other batch numbers, so IDs are matched across all batches
+    requested_ids = [identifier for batch in batches for identifier, _ in batch]
+    all_translations = {}
+    for body in replies.values():
+        all_translations.update(parse_translation_reply(body["choices"][0]["message"]["content"], requested_ids))
+    
+    if limiter is None:
+        limiter = AdaptiveLimiter(1)
+    results = []
+    for batch_number, batch in enumerate(batches, start=1):
+        batch_translations = {identifier: all_translations[identifier] for identifier, _ in batch if identifier in all_translations}
+        missing = [(identifier, text) for identifier, text in batch if identifier not in batch_translations]
+        body = replies.get(f"batch-{batch_number}")
+        status = "failed" if body is None else ("partial" if missing else "ok")
+        current_report().record_request(batch_number, "batch-api", len(batch), len(batch_translations), 1, 0, None, body and body.get("usage"), status)
+        # Requests that failed as a whole are left for resume, as they might fail again with the normal API
+        if missing and body is not None:
+            logger.info(f"Batch {batch_number}: {len(missing)} of {len(batch)} IDs missing or malformed in the reply, requesting them again")
+            batch_translations.update(await _translate_batch(backend, missing, batch_number, limiter, max_retries, missing_id_retries=MISSING_ID_RETRIES - 1, glossary=glossary))
+        if on_batch_done is not None:
+            on_batch_done(batch_translations)
+        results.append(batch_translations)
+    finish_batch_job(requests_path)
+    return results
+
+async def build_glossary(backend, limiter, entries, entries_to_send, max_retries=5, glossary_path=None, debug_mode=False):
+    """
+    Glossary pre-pass: find the terms that recur in the texts of `entries` and translate
+    the ones needed by `entries_to_send` once, in a single request, so that every batch
+    prompt can fix their translation (see glossary.find_terms).
+    
+    Terms from the glossary file of an earlier run, which may have been corrected by hand,
+    are reused as they are, as long as the file was written with the same model and prompt.
+    In debug mode (or with `backend=None`) the new terms get mock translations and are not saved.
+    
+    Returns:
+        Dict mapping German terms to English translations
+    """
+    model = backend.model if backend is not None else MODEL
+    known = load_glossary(glossary_path, model, PROMPT_VERSION)
+    terms = glossary_for_batch(dict.fromkeys(find_terms([text for _, text in entries])), entries_to_send)
+    term_entries = [(f"TERM_{number}", term) for number, term in enumerate(terms, start=1) if term not in known]
+    if not term_entries:
+        return known
+    
+    logger.info(f"Glossary: translating {len(term_entries)} recurring terms ({len(known)} known)")
+    if debug_mode or backend is None:
+        translated = {identifier: generate_mock_translation(term, identifier) for identifier, term in term_entries}
+    else:
+        translated = await _translate_batch(backend, term_entries, 0, limiter, max_retries, kind="glossary")
+    glossary = {**known, **{term: translated[identifier] for identifier, term in term_entries if identifier in translated}}
+    if glossary_path and not debug_mode and backend is not None:
+        save_glossary(glossary_path, glossary, model, PROMPT_VERSION)
+    return glossary
+
+def saved_glossary(glossary_path, backend, glossary=True):
+    """
+    The glossary saved by the last run with `backend`, or an empty one with `glossary=False`.
+    Manifest and cache entries are only reused while their terms keep these translations
+    (see glossary.terms_match).
+    """
+    if not glossary:
+        return {}
+    return load_glossary(glossary_path, backend.model, PROMPT_VERSION)
+
+def read_extracted_entries(extracted_filepath):
+    """
+    Read an _extracted.txt file into a list of (identifier, text) tuples, skipping empty texts.
+    """
     # Read the extracted text
     with open(extracted_filepath, 'r', encoding='utf-8') as f:
         raw_content = f.read().strip()
@@ -47,165 +381,425 @@ def translate_with_openai(extracted_filepath, batch_size=1, api_key=None, debug_
     for identifier, text in matches:
         # Skip if text is empty
         if not text.strip():
-            print(f"Skipping empty text for {identifier}")
+            logger.debug(f"Skipping empty text for {identifier}")
             continue
             
         # Clean up text (remove extra whitespace at beginning/end)
         text = text.strip()
         valid_entries.append((identifier, text))
     
-    translated_entries = []
+    return valid_entries
+
+def resolve_backend(backend=None, api_key=None, base_url=None, debug_mode=False):
+    """
+    Return the backend of a run (see translation_backends.create_backend).
+    In debug mode the backend only names the model and settings and is never opened,
+    so it needs no API key.
+    """
+    if debug_mode and api_key is None:
+        api_key = "debug"
+    return create_backend(backend, api_key, base_url)
+
+def translate_entries(valid_entries, batch_size=1, api_key=None, debug_mode=False, concurrency=4, base_url=None, max_retries=5, cache_path=None, max_input_tokens=MAX_INPUT_TOKENS, max_output_tokens=MAX_OUTPUT_TOKENS, journal_path=None, resume=False, validation_retries=2, known_translations=None, batch_requests_path=None, backend=None, pages=None, glossary_path=None, glossary=True, poll_interval=None):
+    """
+    Translate (identifier, text) entries, which may come from one or several decks.
     
-    print(f"Found {len(valid_entries)} valid entries to translate")
-    print(f"Using batch size: {batch_size}")
+    Identical texts are only translated once and cached translations are reused.
+    Translations that break the LaTeX structure are re-translated up to `validation_retries` times.
+    If `journal_path` is given, every completed batch is recorded there as it arrives;
+    with `resume=True` the translations already in the journal are reused.
+    `known_translations` maps identifiers to translations that are reused as they are,
+    e.g. those of unchanged elements from the previous run of a deck.
+    If `batch_requests_path` is given, the batches are sent as one job of the Batch API,
+    with the requests written to that file and the job polled every `poll_interval` seconds
+    (see translate_batches_with_batch_api).
+    `pages` maps identifiers to their page, so the texts of a page are kept in one batch.
+    With `glossary=True` recurring terms are translated first and fixed in every batch prompt;
+    the glossary is kept in `glossary_path`, if given (see build_glossary).
+    Takes the same options as translate_with_openai.
     
-    # Process entries in batches
-    for i in range(0, len(valid_entries), batch_size):
-        batch = valid_entries[i:i+batch_size]
-        batch_identifiers = [item[0] for item in batch]
-        batch_texts = [item[1] for item in batch]
-        
-        print(f"\n===== BATCH {i//batch_size + 1} =====")
-        print(f"Processing entries {i+1} to {min(i+batch_size, len(valid_entries))}")
-        
-        # Prepare system message
-        system_message = "You are a professional translator specializing in academic and technical content. Translate from German to English, preserving all LaTeX commands and formatting exactly as they appear in the original text. Do not add any $ that were not there before. Also do not make the translation longer than the input."
-        
-        # Build the prompt - using the ID tags approach for all batch sizes
-        prompt = "Translate each of the following German texts to English, preserving all LaTeX commands and formatting exactly as they appear in the original text. Escape all LaTeX special characters (e.g., #, %, _) where necessary, even in plain text environments. Do not add or remove any $ symbols under any circumstances—even if this results in incorrect or unusual LaTeX syntax. Check this carefully, especially around $ delimiters. Ensure all LaTeX commands, braces {}, brackets [], and parentheses () remain exactly as in the original text. Do not remove, add, or modify any structural characters. If a LaTeX environment or function is opened with {, it must be properly closed with }. Each text has a unique ID and must be returned with that exact same ID.\n\n"
-        
-        # Add each text to the prompt with its ID
-        for j, (identifier, text) in enumerate(zip(batch_identifiers, batch_texts)):
-            prompt += f"{identifier}\n{text}\n\n"
-        
-        # Add instructions for all batches
-        prompt += "For each text above, provide the English translation with the exact same ID format:\n\n[ID]\n[Your English translation of the german text]\n\n"
-        prompt += "Keep each ID exactly as provided. Make sure every original text has a corresponding translation."
-        
-        print(f"Sending batch to API with {len(batch_texts)} texts")
-        
+    Returns:
+        Dict mapping identifiers to translations; identifiers whose translation failed are missing
+    """
+    backend = resolve_backend(backend, api_key, base_url, debug_mode)
+    if debug_mode:
+        logger.info("=== RUNNING IN DEBUG MODE - NO API CALLS WILL BE MADE ===")
+    options = dict(batch_size=batch_size, max_retries=max_retries, cache_path=cache_path, max_input_tokens=max_input_tokens,
+                   max_output_tokens=max_output_tokens, journal_path=journal_path, resume=resume, validation_retries=validation_retries,
+                   known_translations=known_translations, batch_requests_path=batch_requests_path, pages=pages,
+                   glossary_path=glossary_path, glossary=glossary, poll_interval=poll_interval)
+    
+    async def run():
         if debug_mode:
+            return await translate_entries_async(valid_entries, backend, None, debug_mode=True, **options)
+        async with backend:
+            limiter = AdaptiveLimiter(concurrency)
+            return await translate_entries_async(valid_entries, backend, limiter, **options)
+    
+    return asyncio.run(run())
+
+@timed_stage("translate")
+async def translate_entries_async(valid_entries, backend, limiter, batch_size=1, max_retries=5, cache_path=None, max_input_tokens=MAX_INPUT_TOKENS, max_output_tokens=MAX_OUTPUT_TOKENS, journal_path=None, resume=False, validation_retries=2, known_translations=None, batch_requests_path=None, pages=None, glossary_path=None, glossary=True, poll_interval=None, debug_mode=False):
+    """
+    Async core of translate_entries, for callers that share one opened backend and limiter
+    between several decks. In debug mode (or with `backend=None`) the entries get mock
+    translations; the backend is then only used for its model and settings and need not be opened.
+    """
+    debug_mode = debug_mode or backend is None
+    if batch_requests_path and not debug_mode and not backend.supports_batch_api:
+        raise ValueError(f"The {backend.name} backend does not support the Batch API")
+    report = current_report()
+    
+    logger.info(f"Found {len(valid_entries)} valid entries to translate")
+    logger.info(f"Using batch size: {batch_size} (token budget: {max_input_tokens} in / {max_output_tokens} out)")
+    
+    # Group identical texts, so that every distinct text is only handled once.
+    # Translations are collected for the first entry of each group and copied to the rest at the end.
+    groups = {}
+    for identifier, text in valid_entries:
+        groups.setdefault(normalize_text(text), []).append((identifier, text))
+    representatives = [group[0] for group in groups.values()]
+    
+    translations = {}
+    # Translations from this run or the journal, which still have to be validated and cached
+    new_entries = []
+    
+    # Reuse the translations of unchanged elements from the previous run
+    if known_translations:
+        for group in groups.values():
+            translation = next((known_translations[identifier] for identifier, _ in group if identifier in known_translations), None)
+            if translation is not None:
+                translations[group[0][0]] = translation
+    
+    # Reuse the translations of an interrupted run
+    journal = None
+    if journal_path and not debug_mode:
+        journal = TranslationJournal(journal_path, resume)
+        if resume:
+            journaled = journal.load()
+            for group in groups.values():
+                translation = next((journaled[identifier] for identifier, _ in group if identifier in journaled), None)
+                if translation is not None:
+                    translations[group[0][0]] = translation
+                    new_entries.append(group[0])
+            logger.info(f"Resuming: {len(translations)} distinct texts already translated")
+    
+    report.count("entries", len(valid_entries))
+    report.count("duplicates", len(valid_entries) - len(representatives))
+    report.count("reused", len(translations))
+    
+    # Look up the translation memory first (mock translations are never cached).
+    # A cached translation is not reused if one of its glossary terms was translated differently since.
+    cache = None
+    if cache_path and not debug_mode:
+        cache = TranslationCache(cache_path, backend.model, PROMPT_VERSION)
+        saved_terms = saved_glossary(glossary_path, backend, glossary)
+        cached = cache.get_many([text for identifier, text in representatives if identifier not in translations], saved_terms)
+        for identifier, text in representatives:
+            if identifier not in translations and text in cached:
+                translations[identifier] = cached[text]
+                report.count("cache_hits")
+    
+    # Only send cache misses
+    entries_to_send = [(identifier, text) for identifier, text in representatives if identifier not in translations]
+    
+    logger.info(f"Sending {len(entries_to_send)} distinct texts ({len(valid_entries) - len(entries_to_send)} reused)")
+    
+    batches, splits = plan_batches(entries_to_send, batch_size, max_input_tokens, max_output_tokens, pages)
+    record_batch = _journal_recorder(journal, splits) if journal else None
+    
+    # Translate the recurring terms first, so that all batches use the same translations for them
+    term_translations = {}
+    if glossary and batches:
+        term_translations = await build_glossary(backend, limiter, representatives, entries_to_send, max_retries, glossary_path, debug_mode)
+        report.count("glossary_terms", len(term_translations))
+    
+    if debug_mode:
+        for batch_number, batch in enumerate(batches, start=1):
+            logger.debug(f"\n===== BATCH {batch_number} =====")
             # In debug mode, print the request instead of sending it
-            print("\n=== DEBUG: API REQUEST ===")
-            print(f"Model: gpt-4o-mini")
-            print(f"Temperature: 0.3")
-            print(f"System message: {system_message}")
+            logger.debug("\n=== DEBUG: API REQUEST ===")
+            logger.debug(f"Model: {backend.model if backend is not None else MODEL}")
+            logger.debug(f"Temperature: {backend.temperature if backend is not None else TEMPERATURE}")
+            logger.debug(f"System message: {SYSTEM_MESSAGE}")
             
-            print("\n--- FULL INPUT TEXTS TO TRANSLATOR ---")
-            for j, (identifier, text) in enumerate(zip(batch_identifiers, batch_texts)):
-                print(f"\nText {j+1}:")
-                print(f"{identifier}")
-                print(f"{text}")
-                print("\n---")
-            print("--- END FULL INPUT TEXTS ---\n")
+            logger.debug("\n--- FULL INPUT TEXTS TO TRANSLATOR ---")
+            for j, (identifier, text) in enumerate(batch):
+                logger.debug(f"\nText {j+1}:")
+                logger.debug(f"{identifier}")
+                logger.debug(f"{text}")
+                logger.debug("\n---")
+            logger.debug("--- END FULL INPUT TEXTS ---\n")
             
             # Print prompt structure
-            prompt_structure = re.sub(r'(TRANSLATE_[A-Za-z0-9]+\n).*?(\n\n|$)', r'\1[TEXT CONTENT]\2', prompt)
-            print(f"User message structure:\n{prompt_structure}")
-            print("=== END DEBUG API REQUEST ===\n")
+            prompt_structure = build_prompt([(identifier, "[TEXT CONTENT]") for identifier, _ in batch])
+            logger.debug(f"Glossary terms: {glossary_for_batch(term_translations, batch)}")
+            logger.debug(f"User message structure:\n{prompt_structure}")
+            logger.debug("=== END DEBUG API REQUEST ===\n")
             
             # Generate mock translations for each item in the batch
-            print("--- DEBUG MOCK TRANSLATIONS (COMPLETE) ---")
-            for j, (identifier, text) in enumerate(zip(batch_identifiers, batch_texts)):
+            logger.debug("--- DEBUG MOCK TRANSLATIONS (COMPLETE) ---")
+            for j, (identifier, text) in enumerate(batch):
                 mock_translation = generate_mock_translation(text, identifier)
-                translated_entries.append(f"{identifier}\n{mock_translation}")
-                print(f"\nTranslation for text {j+1}:\n{identifier}\n{mock_translation}")
-            print("--- END DEBUG MOCK TRANSLATIONS ---")
-        else:
-            try:
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": system_message},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0
-                )
-                
-                translation_text = response.choices[0].message.content.strip()
-                print("\n=== CHATGPT REPLY ===")
-                print(translation_text)
-                print("=== END REPLY ===\n")
-                
-                # Extract translations using a simpler approach
-                translations = {}
-                lines = translation_text.split('\n')
-                
-                current_id = None
-                current_translation = []
-                
-                for line in lines:
-                    # Check if this line contains an identifier
-                    if "TRANSLATE_" in line:
-                        # If we were already collecting a translation, save it
-                        if current_id and current_translation:
-                            translations[current_id] = '\n'.join(current_translation).strip()
-                            print(f"Found translation for {current_id}")
-                            current_translation = []
-                        
-                        # Extract the ID - just get the TRANSLATE_ part
-                        id_parts = re.search(r'TRANSLATE_[a-zA-Z0-9]+', line)
-                        if id_parts:
-                            current_id = id_parts.group(0)
-                            print(f"Found ID: {current_id}")
-                            # Skip the line with the ID - don't add it to translation
-                    else:
-                        # Only add non-ID lines to the translation
-                        if current_id:
-                            current_translation.append(line)
-                
-                # Don't forget the last translation
-                if current_id and current_translation:
-                    translations[current_id] = '\n'.join(current_translation).strip()
-                    print(f"Found translation for {current_id}")
-                
-                # Add translations to results, using original text as fallback
-                for identifier, text in zip(batch_identifiers, batch_texts):
-                    if identifier in translations:
-                        translated_entries.append(f"{identifier}\n{translations[identifier]}")
-                    else:
-                        print(f"WARNING: Could not find translation for {identifier}, using original text")
-                        translated_entries.append(f"{identifier}\n{text}")
-                
-            except Exception as e:
-                print(f"Error processing batch: {e}")
-                # Fallback: keep original texts
-                for identifier, text in zip(batch_identifiers, batch_texts):
-                    translated_entries.append(f"{identifier}\n{text}")
-                time.sleep(1)
+                translations[identifier] = mock_translation
+                logger.debug(f"\nTranslation for text {j+1}:\n{identifier}\n{mock_translation}")
+            logger.debug("--- END DEBUG MOCK TRANSLATIONS ---")
+    elif batches and batch_requests_path:
+        logger.info(f"Sending {len(batches)} batches as one Batch API job")
+        batch_results = await translate_batches_with_batch_api(backend, batches, batch_requests_path, resume, on_batch_done=record_batch, limiter=limiter, max_retries=max_retries, glossary=term_translations, poll_interval=poll_interval)
+        for batch_translations in batch_results:
+            translations.update(batch_translations)
+    elif batches:
+        logger.info(f"Sending {len(batches)} batches with up to {limiter.max_concurrency} in flight")
+        
+        batch_results = await translate_batches_async(backend, batches, max_retries=max_retries, on_batch_done=record_batch, limiter=limiter, glossary=term_translations)
+        for batch_translations in batch_results:
+            translations.update(batch_translations)
+    
+    join_split_translations(translations, splits)
+    new_entries += [entry for entry in entries_to_send if entry[0] in translations]
+    
+    # Check the LaTeX structure and re-translate broken entries in small batches
+    invalid = set()
+    if not debug_mode:
+        invalid = await _retranslate_invalid(new_entries, translations, backend, limiter, max_retries, validation_retries, journal, term_translations)
+    
+    if cache is not None:
+        cache.put_many([(text, translations[identifier]) for identifier, text in new_entries if identifier not in invalid], term_translations)
+        cache.report()
+        cache.close()
+    
+    # Reuse each translation for all duplicates of its text
+    for group in groups.values():
+        first_identifier = group[0][0]
+        if first_identifier in translations:
+            for identifier, _ in group[1:]:
+                translations[identifier] = translations[first_identifier]
+    
+    failed = sum(1 for identifier, _ in valid_entries if identifier not in translations)
+    report.count("sent", len(entries_to_send))
+    report.count("invalid", len(invalid))
+    report.count("fallbacks", failed)
+    if failed and journal is not None:
+        logger.warning(f"WARNING: {failed} entries could not be translated. Run again with resume=True to retry only those.")
+    
+    return translations
+
+def _journal_recorder(journal, splits):
+    """
+    on_batch_done callback that records every finished batch in `journal`.
+    The parts of a split entry (see batch_planner.plan_batches) are held back until all of them
+    are translated and then recorded joined under the entry's identifier, which is what a
+    resumed run looks up.
+    """
+    owners = {part_identifier: identifier for identifier, parts in splits.items() for part_identifier, _ in parts}
+    finished_parts = {}
+    
+    def record(batch_translations):
+        translations = {identifier: translation for identifier, translation in batch_translations.items() if identifier not in owners}
+        for part_identifier in batch_translations.keys() & owners.keys():
+            finished_parts[part_identifier] = batch_translations[part_identifier]
+            parts = splits[owners[part_identifier]]
+            if all(identifier in finished_parts for identifier, _ in parts):
+                translations[owners[part_identifier]] = ''.join(finished_parts[identifier] + separator for identifier, separator in parts)
+        journal.record(translations)
+    
+    return record
+
+async def _retranslate_invalid(entries, translations, backend, limiter, max_retries, validation_retries, journal, glossary=None):
+    """
+    Validate the translations of `entries` and send the ones with LaTeX problems again,
+    in small batches that tell the model what was wrong. A new translation replaces the
+    old one if it has fewer problems.
+    
+    Returns:
+        Set of identifiers whose translation still has problems
+    """
+    texts = dict(entries)
+    problems = {}
+    for identifier, text in entries:
+        entry_problems = validate_translation(text, translations[identifier])
+        if entry_problems:
+            problems[identifier] = entry_problems
+    
+    for round_number in range(1, validation_retries + 1):
+        if not problems:
+            break
+        logger.info(f"Validation: re-translating {len(problems)} entries with LaTeX problems (round {round_number}/{validation_retries})")
+        current_report().count("validation_retranslations", len(problems))
         
-        # Sleep between batches to avoid rate limits (skip in debug mode)
-        if not debug_mode:
-            time.sleep(0.5)
+        batches, splits = plan_batches([(identifier, texts[identifier]) for identifier in problems], RETRY_BATCH_SIZE)
+        retranslated = {}
+        for batch_translations in await translate_batches_async(backend, batches, max_retries=max_retries, limiter=limiter, feedback=problems, glossary=glossary):
+            retranslated.update(batch_translations)
+        join_split_translations(retranslated, splits)
+        
+        accepted = {}
+        for identifier, translation in retranslated.items():
+            new_problems = validate_translation(texts[identifier], translation)
+            if len(new_problems) < len(problems[identifier]):
+                accepted[identifier] = translation
+                if new_problems:
+                    problems[identifier] = new_problems
+                else:
+                    del problems[identifier]
+        translations.update(accepted)
+        if journal is not None:
+            journal.record(accepted)
+    
+    if problems:
+        logger.info(f"Validation: {len(problems)} entries still have LaTeX problems, see the log file")
+    return set(problems)
+
+def journal_path_for(extracted_filepath):
+    """
+    Path of the journal that belongs to an _extracted.txt file.
+    """
+    return extracted_filepath.rsplit('.', 1)[0] + '_journal.jsonl'
+
+def write_translations(extracted_filepath, valid_entries, translations, check_latex=True):
+    """
+    Write the _translated.txt file for an extracted file, in the original entry order,
+    and write the log file (see write_translation_log).
+    
+    Returns:
+        Path to the _translated.txt file
+    """
+    # Add translations to results in the original order, using original text as fallback
+    translated_entries = []
+    missing = 0
+    for identifier, text in valid_entries:
+        if identifier in translations:
+            translated_entries.append(f"{identifier}\n{translations[identifier]}")
+        else:
+            logger.debug(f"Could not find translation for {identifier}, using original text")
+            translated_entries.append(f"{identifier}\n{text}")
+            missing += 1
+    if missing:
+        logger.warning(f"WARNING: Could not find translations for {missing} entries, using original text")
     
     # Save translations to a new file
     output_filepath = extracted_filepath.rsplit('.', 1)[0] + '_translated.txt'
     with open(output_filepath, 'w', encoding='utf-8') as f:
         f.write('\n\n'.join(translated_entries))
     
-    print(f"\nTranslations saved to: {output_filepath}")
+    logger.info(f"\nTranslations saved to: {output_filepath}")
     
+    write_translation_log(extracted_filepath, valid_entries, translations, check_latex)
+    return output_filepath
+
+@timed_stage("write")
+def write_translation_log(extracted_filepath, valid_entries, translations, check_latex=True):
+    """
+    Log lines with an odd number of $ symbols to <name>.log next to the extracted file.
+    With `check_latex`, translations that still break the LaTeX structure of their
+    original are logged as well.
+    """
     # Print analysis of all translations once at the end
-    print("\n=== FINAL TRANSLATIONS ANALYSIS ===")
+    logger.info("\n=== FINAL TRANSLATIONS ANALYSIS ===")
     
     # Create log file for lines with odd number of $ symbols
     log_filepath = extracted_filepath.rsplit('.', 1)[0] + '.log'
     with open(log_filepath, 'a', encoding='utf-8') as log_file:
-        for entry in translated_entries:
+        for identifier, text in valid_entries:
             past_line = ""
-            for line in entry.split('\n'):
+            for line in f"{identifier}\n{translations.get(identifier, text)}".split('\n'):
                 count = line.count('$')
                 # Log lines with odd number of $ symbols
                 if count % 2 != 0:
-                    print(f" printing {line}\n")
+                    logger.debug(f" printing {line}\n")
                     log_file.write(f"{past_line}\n")
                     log_file.write(f"{count} $'s: {line}\n")
                 past_line = line
-            print("---")  # Separator between entries
+            logger.debug("---")  # Separator between entries
+        
+        # Log the entries whose LaTeX structure differs from the original
+        invalid_count = 0
+        if check_latex:
+            for identifier, text in valid_entries:
+                if identifier not in translations:
+                    continue
+                problems = validate_translation(text, translations[identifier])
+                if problems:
+                    invalid_count += 1
+                    log_file.write(f"{identifier}: {'; '.join(problems)}\n")
     
-    print(f"\nLog file with odd $ counts saved to: {log_filepath}")
+    if invalid_count:
+        logger.warning(f"WARNING: {invalid_count} translations still have LaTeX problems, see {log_filepath}")
+    logger.info(f"\nLog file with odd $ counts saved to: {log_filepath}")
+
+def translate_deck_entries(valid_entries, extracted_filepath, batch_size=1, api_key=None, debug_mode=False, concurrency=4, base_url=None, max_retries=5, cache_path=None, max_input_tokens=MAX_INPUT_TOKENS, max_output_tokens=MAX_OUTPUT_TOKENS, resume=False, validation_retries=2, incremental=True, batch_api=False, backend=None, pages=None, glossary=True, poll_interval=None):
+    """
+    Translate the entries of one deck, using the deck's journal, manifest and glossary.
     
-    return output_filepath
+    `extracted_filepath` only names the journal, manifest, glossary and Batch API files; the file itself is not read,
+    so this also works for entries that were never written to disk.
+    `pages` maps identifiers to their page (see batch_planner.plan_batches).
+    Takes the same options as translate_with_openai.
+    
+    Returns:
+        Dict mapping identifiers to translations; identifiers whose translation failed are missing
+    """
+    known_translations = None
+    manifest_path = manifest_path_for(extracted_filepath)
+    glossary_path = glossary_path_for(extracted_filepath)
+    # Resolved once here, as the manifest is tied to the model of the backend
+    backend = resolve_backend(backend, api_key, base_url, debug_mode)
+    if incremental and not debug_mode:
+        known_translations = diff_against_manifest(valid_entries, load_manifest(manifest_path, backend.model, PROMPT_VERSION), saved_glossary(glossary_path, backend, glossary))
+    
+    batch_requests_path = batch_requests_path_for(extracted_filepath) if batch_api else None
+    translations = translate_entries(valid_entries, batch_size, debug_mode=debug_mode, concurrency=concurrency, max_retries=max_retries, cache_path=cache_path,
+                                     max_input_tokens=max_input_tokens, max_output_tokens=max_output_tokens, journal_path=journal_path_for(extracted_filepath),
+                                     resume=resume, validation_retries=validation_retries, known_translations=known_translations,
+                                     batch_requests_path=batch_requests_path, backend=backend, pages=pages,
+                                     glossary_path=glossary_path, glossary=glossary, poll_interval=poll_interval)
+    
+    if not debug_mode:
+        save_manifest(manifest_path, valid_entries, translations, backend.model, PROMPT_VERSION, saved_glossary(glossary_path, backend, glossary))
+    return translations
+
+def translate_with_openai(extracted_filepath, batch_size=1, api_key=None, debug_mode=False, concurrency=4, base_url=None, max_retries=5, cache_path=None, max_input_tokens=MAX_INPUT_TOKENS, max_output_tokens=MAX_OUTPUT_TOKENS, resume=False, validation_retries=2, incremental=True, batch_api=False, backend=None, glossary=True, poll_interval=None):
+    """
+    Translate the extracted text using OpenAI's API and save to a new file.
+    
+    Args:
+        extracted_filepath: Path to the file with extracted text
+        batch_size: Maximum number of entries to batch in a single API request
+        api_key: OpenAI API key (if None, will try to get from environment variable)
+        debug_mode: If True, will print API requests without actually sending them
+        concurrency: Maximum number of batches in flight at the same time
+        base_url: Optional URL of an OpenAI-compatible server (e.g. a local fake server for testing)
+        max_retries: How often a batch is retried after rate limits or transient errors
+        cache_path: Path to the SQLite translation memory (None disables caching)
+        max_input_tokens: Estimated input token budget for the texts of a single request
+        max_output_tokens: Estimated output token budget for the translations of a single request
+        resume: If True, reuse the translations recorded in the journal of an interrupted run
+            and only translate the missing or failed entries
+        validation_retries: How often entries whose translation breaks the LaTeX structure
+            (braces, math delimiters, commands, unescaped special characters) are re-translated
+        incremental: If True, reuse the translations of unchanged elements recorded in the
+            manifest of the previous run, and only translate added or changed elements
+        batch_api: If True, send all batches as one job of the OpenAI Batch API (half the price,
+            separate rate limits) and wait for it to finish, which can take up to 24 hours.
+            Re-translations of entries with LaTeX problems still use the normal API
+        backend: Where the requests go: a backend from translation_backends (e.g.
+            LocalBackend for a llama.cpp or vLLM server) or one of the names "openai", "local"
+            and "mock". None uses the OpenAI API with `api_key` and `base_url`
+        glossary: If True, translate the terms that recur in the deck once before the batches
+            and give every batch the translations of its terms, so they are translated consistently.
+            The glossary is saved to <name>_glossary.json, where it can be corrected for the next run
+        poll_interval: Seconds between two status requests of a Batch API job (default: batch_api.POLL_INTERVAL)
+    
+    Entries are batched by page (as recorded by extract_translations), so the texts of a slide
+    are translated together where they fit into one request.
+    """
+    valid_entries = read_extracted_entries(extracted_filepath)
+    translations = translate_deck_entries(valid_entries, extracted_filepath, batch_size, api_key=api_key, debug_mode=debug_mode, concurrency=concurrency,
+                                          base_url=base_url, max_retries=max_retries, cache_path=cache_path, max_input_tokens=max_input_tokens,
+                                          max_output_tokens=max_output_tokens, resume=resume, validation_retries=validation_retries,
+                                          incremental=incremental, batch_api=batch_api, backend=backend, pages=read_pages(extracted_filepath), glossary=glossary, poll_interval=poll_interval)
+    return write_translations(extracted_filepath, valid_entries, translations, check_latex=not debug_mode)
 
 # Usage example
 if __name__ == "__main__":
@@ -1,9 +1,57 @@
 import os
-from split import extract_translations
-from translate_with_openai import translate_with_openai
-from merge import merge_translations
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from split import extract_translations, stamp_identifiers, read_pages
+from translate_with_openai import translate_with_openai, read_extracted_entries, translate_entries, write_translations
+from translate_with_openai import translate_deck_entries, write_translation_log
+from translate_with_openai import translate_entries_async, resolve_backend, journal_path_for, saved_glossary, AdaptiveLimiter, PROMPT_VERSION
+from glossary import glossary_path_for
+from translation_manifest import manifest_path_for, load_manifest, save_manifest, diff_against_manifest
+from merge import merge_translations, merge_into_original
+from translation_cache import DEFAULT_CACHE_PATH
+from run_report import current_report, reporting_run
 
-def translate_ipe_file(input_filepath, batch_size=3, max_elements=None, api_key=None, debug_mode=False):
+logger = logging.getLogger(__name__)
+
+def extract_or_resume(input_filepath, max_elements, resume=False):
+    """
+    Extract the texts of an IPE file, or reuse the files of an earlier run when resuming.
+    Reusing the files of the interrupted run saves parsing the deck again. They are only
+    reused if they are newer than the deck; after the deck was edited it is extracted again,
+    which is safe because the identifiers of unchanged elements stay the same.
+    
+    Returns:
+        Path to the _extracted.txt file
+    """
+    extracted_file = input_filepath.rsplit('.', 1)[0] + '_extracted.txt'
+    ipe_with_ids = input_filepath.rsplit('.', 1)[0] + '_en.ipe'
+    if resume and os.path.exists(extracted_file) and os.path.exists(ipe_with_ids):
+        deck_modified = os.path.getmtime(input_filepath)
+        if os.path.getmtime(extracted_file) >= deck_modified and os.path.getmtime(ipe_with_ids) >= deck_modified:
+            logger.info(f"Resuming: reusing {extracted_file} and {ipe_with_ids}")
+            return extracted_file
+        logger.info(f"Resuming: {input_filepath} changed since it was extracted, extracting it again")
+    return extract_translations(input_filepath, max_elements)
+
+def _select_backend(backend, api_key, base_url, debug_mode, batch_api):
+    """
+    Create the backend of a run (also in debug mode, where it is never opened) and check
+    that it can do what the run needs.
+    """
+    backend = resolve_backend(backend, api_key, base_url, debug_mode)
+    if batch_api and not debug_mode and not backend.supports_batch_api:
+        raise ValueError(f"The {backend.name} backend does not support the Batch API")
+    return backend
+
+def _run_settings(backend, **settings):
+    """
+    Settings of a run for its report, with the backend, model and temperature that are actually used.
+    """
+    return {**backend.describe(), "prompt_version": PROMPT_VERSION, **settings}
+
+def translate_ipe_file(input_filepath, batch_size=3, max_elements=None, api_key=None, debug_mode=False, concurrency=4, base_url=None, cache_path=DEFAULT_CACHE_PATH, resume=False, incremental=True, intermediate_files=False, batch_api=False, verbosity=0, backend=None, glossary=True, poll_interval=None):
     """
     Complete workflow to translate an IPE file from German to English.
     
@@ -13,44 +61,122 @@ def translate_ipe_file(input_filepath, batch_size=3, max_elements=None, api_key=
         max_elements: Maximum number of elements to translate (None for all)
         api_key: OpenAI API key (if None, will try to get from environment variable)
         debug_mode: If True, will print API requests without actually sending them
+        concurrency: Maximum number of API requests in flight at the same time
+        base_url: Optional URL of an OpenAI-compatible server to send requests to
+        cache_path: Path to the SQLite translation memory (None disables caching)
+        resume: If True, continue an interrupted run: reuse its extracted files and
+            journal, and only translate the entries that are missing or failed
+        incremental: If True, reuse the translations of the previous run for unchanged
+            elements and only translate added or changed elements
+        intermediate_files: If True, write the _en.ipe, _extracted.txt and _translated.txt
+            files and merge from them, so they can be inspected or fixed by hand. Otherwise only
+            the texts are kept in memory, and the translations are streamed into a copy of the
+            original file, which keeps all other bytes unchanged
+        batch_api: If True, translate with one job of the OpenAI Batch API instead of
+            individual requests; cheaper, but can take up to 24 hours
+        verbosity: 0 only prints warnings and the run summary, 1 also the progress of every
+            stage and batch, 2 also the full prompts and replies (always used in debug mode).
+            Timings, requests and token usage are saved to <name>_report.json / .csv
+        backend: Where the requests go: a backend from translation_backends (e.g. LocalBackend
+            for a llama.cpp or vLLM server on this machine) or one of the names "openai", "local"
+            and "mock". None uses the OpenAI API with `api_key` and `base_url`
+        glossary: If True, translate the terms that recur in the deck once and give every batch
+            the translations of its terms; the glossary is saved to <name>_extracted_glossary.json
+        poll_interval: Seconds between two status requests of a Batch API job (default: 60)
         
     Returns:
         Path to the final merged file
     """
-    print(f"=== STARTING TRANSLATION WORKFLOW FOR {input_filepath} ===")
-    print(f"Batch size: {batch_size}")
-    print(f"Max elements: {max_elements if max_elements else 'All'}")
-    print(f"Debug mode: {'Enabled' if debug_mode else 'Disabled'}")
+    backend = _select_backend(backend, api_key, base_url, debug_mode, batch_api)
+    settings = _run_settings(backend, batch_size=batch_size, concurrency=concurrency, batch_api=batch_api, debug_mode=debug_mode, glossary=glossary)
+    with reporting_run(input_filepath.rsplit('.', 1)[0] + '_report', max(verbosity, 2) if debug_mode else verbosity, settings):
+        translate_file = _translate_ipe_file_with_files if intermediate_files else _translate_ipe_file_in_memory
+        return translate_file(input_filepath, batch_size=batch_size, max_elements=max_elements, backend=backend, debug_mode=debug_mode,
+                              concurrency=concurrency, cache_path=cache_path, resume=resume, incremental=incremental, batch_api=batch_api, glossary=glossary, poll_interval=poll_interval)
+
+def _translate_ipe_file_with_files(input_filepath, batch_size, max_elements, backend, debug_mode, concurrency, cache_path, resume, incremental, batch_api, glossary, poll_interval):
+    """
+    translate_ipe_file with intermediate files: extract to files, translate the extracted
+    file and merge the translated file back into the deck.
+    """
+    logger.info(f"=== STARTING TRANSLATION WORKFLOW FOR {input_filepath} ===")
+    logger.info(f"Batch size: {batch_size}")
+    logger.info(f"Concurrency: {concurrency}")
+    logger.info(f"Max elements: {max_elements if max_elements else 'All'}")
+    logger.info(f"Debug mode: {'Enabled' if debug_mode else 'Disabled'}")
+    logger.info(f"Resume: {'Enabled' if resume else 'Disabled'}")
+    logger.info(f"Backend: {backend.name} ({backend.model}, temperature {backend.temperature})")
     
     # Step 1: Extract text from IPE file
-    print("\n=== STEP 1: EXTRACTING TEXT ===")
+    logger.info("\n=== STEP 1: EXTRACTING TEXT ===")
     if max_elements is None:
         # If max_elements is None, we want to extract all elements
         # The default in extract_translations is 10, so we set a very high number
         max_elements = 10000
     
-    extracted_file = extract_translations(input_filepath, max_elements)
+    extracted_file = extract_or_resume(input_filepath, max_elements, resume)
     
     # Step 2: Translate the extracted text
-    print("\n=== STEP 2: TRANSLATING TEXT ===")
-    translated_file = translate_with_openai(extracted_file, batch_size, api_key, debug_mode)
+    logger.info("\n=== STEP 2: TRANSLATING TEXT ===")
+    translated_file = translate_with_openai(extracted_file, batch_size, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, resume=resume, incremental=incremental, batch_api=batch_api, backend=backend, glossary=glossary, poll_interval=poll_interval)
     
     # Step 3: Merge translations back into IPE file
-    print("\n=== STEP 3: MERGING TRANSLATIONS ===")
+    logger.info("\n=== STEP 3: MERGING TRANSLATIONS ===")
     # The extract_translations function creates a file with _en.ipe suffix
     ipe_with_ids = input_filepath.rsplit('.', 1)[0] + '_en.ipe'
     merged_file = merge_translations(ipe_with_ids, translated_file)
     
-    print(f"\n=== WORKFLOW COMPLETE ===")
-    print(f"Original file: {input_filepath}")
-    print(f"Extracted text: {extracted_file}")
-    print(f"Translated text: {translated_file}")
-    print(f"IPE with IDs: {ipe_with_ids}")
-    print(f"Final merged file: {merged_file}")
+    logger.info(f"\n=== WORKFLOW COMPLETE ===")
+    logger.info(f"Original file: {input_filepath}")
+    logger.info(f"Extracted text: {extracted_file}")
+    logger.info(f"Translated text: {translated_file}")
+    logger.info(f"IPE with IDs: {ipe_with_ids}")
+    logger.info(f"Final merged file: {merged_file}")
     
     return merged_file
 
-def translate_slides_range(start_slide, end_slide, batch_size=100, max_elements=1000000, api_key=None, debug_mode=False):
+def _translate_ipe_file_in_memory(input_filepath, batch_size, max_elements, backend, debug_mode, concurrency, cache_path, resume, incremental, batch_api, glossary, poll_interval):
+    """
+    translate_ipe_file without intermediate files: the deck is parsed once to collect its texts,
+    and the translations are streamed into a copy of the original file (see merge.merge_into_original),
+    which keeps every byte outside of the texts unchanged. Only the log, journal, manifest and glossary are written.
+    """
+    logger.info(f"=== STARTING IN-MEMORY TRANSLATION WORKFLOW FOR {input_filepath} ===")
+    logger.info(f"Batch size: {batch_size}")
+    logger.info(f"Concurrency: {concurrency}")
+    logger.info(f"Max elements: {max_elements if max_elements else 'All'}")
+    logger.info(f"Debug mode: {'Enabled' if debug_mode else 'Disabled'}")
+    logger.info(f"Resume: {'Enabled' if resume else 'Disabled'}")
+    logger.info(f"Backend: {backend.name} ({backend.model}, temperature {backend.temperature})")
+    
+    # Step 1: Replace the texts with identifiers
+    logger.info("\n=== STEP 1: EXTRACTING TEXT ===")
+    report = current_report()
+    with report.stage("extract"):
+        # The parsed tree is dropped right away; only the texts are needed until the merge
+        _, entries, pages = stamp_identifiers(input_filepath, max_elements if max_elements is not None else 10000)
+    valid_entries = [(identifier, text.strip()) for identifier, text in entries]
+    logger.info(f"Extracted {len(valid_entries)} texts")
+    
+    # Step 2: Translate the texts; the journal, manifest, glossary and log are named as in the file-based workflow
+    logger.info("\n=== STEP 2: TRANSLATING TEXT ===")
+    base_path = input_filepath.rsplit('.', 1)[0] + '_extracted.txt'
+    translations = translate_deck_entries(valid_entries, base_path, batch_size, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, resume=resume, incremental=incremental, batch_api=batch_api, backend=backend, pages=pages, glossary=glossary, poll_interval=poll_interval)
+    write_translation_log(base_path, valid_entries, translations, check_latex=not debug_mode)
+    
+    # Step 3: Put the translations into a copy of the original file; untranslated texts stay as they are
+    logger.info("\n=== STEP 3: MERGING TRANSLATIONS ===")
+    merged_file = input_filepath.rsplit('.', 1)[0] + '_en_merged.ipe'
+    with report.stage("merge"):
+        merge_into_original(input_filepath, merged_file, entries, translations)
+    
+    logger.info(f"\n=== WORKFLOW COMPLETE ===")
+    logger.info(f"Original file: {input_filepath}")
+    logger.info(f"Final merged file: {merged_file}")
+    
+    return merged_file
+
+def translate_slides_range(start_slide, end_slide, batch_size=100, max_elements=1000000, api_key=None, debug_mode=False, concurrency=4, base_url=None, cache_path=DEFAULT_CACHE_PATH, global_batching=False, resume=False, parallel=False, workers=None, incremental=True, intermediate_files=False, batch_api=False, verbosity=0, backend=None, glossary=True, poll_interval=None):
     """
     Translate a range of slides from start_slide to end_slide (inclusive).
     
@@ -61,25 +187,227 @@ def translate_slides_range(start_slide, end_slide, batch_size=100, max_elements=
         max_elements: Maximum number of elements to translate per slide
         api_key: OpenAI API key
         debug_mode: If True, will print API requests without actually sending them
+        concurrency: Maximum number of API requests in flight at the same time
+        base_url: Optional URL of an OpenAI-compatible server to send requests to
+        cache_path: Path to the SQLite translation memory (None disables caching)
+        global_batching: If True, extract all decks first and translate their texts together,
+            so identical texts are translated once per range and batches are filled across decks
+        resume: If True, continue an interrupted run and only translate missing or failed entries
+        parallel: If True, extract and merge decks on a process pool while other decks are being
+            translated, instead of processing one deck after the other
+        workers: Number of worker processes (and decks translated at the same time) in parallel mode
+        incremental: If True, only translate elements that were added or changed since the previous run
+        intermediate_files: If True, write and merge from the intermediate text files of every deck
+            (global batching and parallel mode always write them)
+        batch_api: If True, translate with the OpenAI Batch API (one job per deck, or one job
+            for the whole range with global batching); cannot be combined with `parallel`
+        verbosity: Log detail as in translate_ipe_file; one report for the whole range is saved
+            to slides/slidesXX-YY_report.json / .csv
+        backend: Backend for all decks of the range, as in translate_ipe_file
+        glossary: If True, build a glossary of recurring terms per deck (or one for the whole
+            range with global batching, saved to slides/slidesXX-YY_glossary.json)
+        poll_interval: Seconds between two status requests of a Batch API job, as in translate_ipe_file
     """
-    print(f"\n=== STARTING BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+    if global_batching and parallel:
+        raise ValueError("global_batching and parallel cannot be combined")
+    if batch_api and parallel:
+        raise ValueError("batch_api and parallel cannot be combined")
+    
+    backend = _select_backend(backend, api_key, base_url, debug_mode, batch_api)
+    settings = _run_settings(backend, batch_size=batch_size, concurrency=concurrency, batch_api=batch_api, debug_mode=debug_mode,
+                             glossary=glossary, global_batching=global_batching, parallel=parallel, workers=workers)
+    with reporting_run(f"slides/slides{start_slide:02d}-{end_slide:02d}_report", max(verbosity, 2) if debug_mode else verbosity, settings):
+        _translate_slides_range(start_slide, end_slide, batch_size=batch_size, max_elements=max_elements, backend=backend, debug_mode=debug_mode,
+                                concurrency=concurrency, cache_path=cache_path, global_batching=global_batching, resume=resume, parallel=parallel,
+                                workers=workers, incremental=incremental, intermediate_files=intermediate_files, batch_api=batch_api, glossary=glossary, poll_interval=poll_interval)
+
+def _translate_slides_range(start_slide, end_slide, batch_size, max_elements, backend, debug_mode, concurrency, cache_path, global_batching, resume, parallel, workers, incremental, intermediate_files, batch_api, glossary, poll_interval):
+    logger.info(f"\n=== STARTING BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+    
+    if parallel:
+        translate_slides_range_parallel(start_slide, end_slide, batch_size, max_elements, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, resume=resume, workers=workers, incremental=incremental, backend=backend, glossary=glossary)
+        logger.info(f"\n=== COMPLETED BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+        return
+    
+    if global_batching:
+        translate_slides_range_globally(start_slide, end_slide, batch_size, max_elements, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, resume=resume, incremental=incremental, batch_api=batch_api, backend=backend, glossary=glossary, poll_interval=poll_interval)
+        logger.info(f"\n=== COMPLETED BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+        return
     
     for slide_num in range(start_slide, end_slide + 1):
         input_file = f"slides/slides{slide_num:02d}.ipe"
         if not os.path.exists(input_file):
-            print(f"\nWARNING: File {input_file} not found, skipping...")
+            logger.warning(f"\nWARNING: File {input_file} not found, skipping...")
             continue
             
-        print(f"\n=== PROCESSING SLIDE {slide_num:02d} ===")
+        logger.info(f"\n=== PROCESSING SLIDE {slide_num:02d} ===")
+        try:
+            translate_ipe_file(input_file, batch_size, max_elements, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, resume=resume, incremental=incremental, intermediate_files=intermediate_files, batch_api=batch_api, backend=backend, glossary=glossary, poll_interval=poll_interval)
+            logger.info(f"Successfully processed slide {slide_num:02d}")
+        except Exception as e:
+            logger.error(f"Error processing slide {slide_num:02d}: {e}")
+            logger.info("Continuing with next slide...")
+            continue
+    
+    logger.info(f"\n=== COMPLETED BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+
+def translate_slides_range_globally(start_slide, end_slide, batch_size=100, max_elements=1000000, api_key=None, debug_mode=False, concurrency=4, base_url=None, cache_path=DEFAULT_CACHE_PATH, resume=False, incremental=True, batch_api=False, backend=None, glossary=True, poll_interval=None):
+    """
+    Translate a range of slides with one shared translation pass.
+    
+    All decks are extracted first, then the texts of all decks are deduplicated and
+    packed into batches together (keeping the texts of a slide together), one glossary is
+    built for the whole range, and the translations are merged back into every deck.
+    Takes the same arguments as translate_slides_range.
+    """
+    backend = resolve_backend(backend, api_key, base_url, debug_mode)
+    
+    # Step 1: Extract every deck, remembering its entries
+    logger.info("\n=== STEP 1: EXTRACTING TEXT FROM ALL SLIDES ===")
+    decks = []
+    pages = {}
+    for slide_num in range(start_slide, end_slide + 1):
+        input_file = f"slides/slides{slide_num:02d}.ipe"
+        if not os.path.exists(input_file):
+            logger.warning(f"\nWARNING: File {input_file} not found, skipping...")
+            continue
+        
+        try:
+            extracted_file = extract_or_resume(input_file, max_elements, resume)
+            decks.append((slide_num, input_file, extracted_file, read_extracted_entries(extracted_file)))
+            # Pages are numbered per deck, so they are told apart by the slide number
+            for identifier, page in (read_pages(extracted_file) or {}).items():
+                pages[identifier] = (slide_num, page)
+        except Exception as e:
+            logger.error(f"Error extracting slide {slide_num:02d}: {e}")
+            logger.info("Continuing with next slide...")
+    
+    # Step 2: Translate the texts of all decks together
+    logger.info("\n=== STEP 2: TRANSLATING TEXT OF ALL SLIDES ===")
+    all_entries = [entry for _, _, _, entries in decks for entry in entries]
+    glossary_path = f"slides/slides{start_slide:02d}-{end_slide:02d}_glossary.json"
+    known_translations = {}
+    if incremental and not debug_mode:
+        range_glossary = saved_glossary(glossary_path, backend, glossary)
+        for _, _, extracted_file, entries in decks:
+            known_translations.update(diff_against_manifest(entries, load_manifest(manifest_path_for(extracted_file), backend.model, PROMPT_VERSION), range_glossary))
+    journal_path = f"slides/slides{start_slide:02d}-{end_slide:02d}_journal.jsonl"
+    batch_requests_path = f"slides/slides{start_slide:02d}-{end_slide:02d}_batch_requests.jsonl" if batch_api else None
+    translations = translate_entries(all_entries, batch_size, debug_mode=debug_mode, concurrency=concurrency, cache_path=cache_path, journal_path=journal_path, resume=resume, known_translations=known_translations, batch_requests_path=batch_requests_path, backend=backend, pages=pages, glossary_path=glossary_path, glossary=glossary, poll_interval=poll_interval)
+    
+    # Step 3: Fan the translations back out to every deck
+    logger.info("\n=== STEP 3: MERGING TRANSLATIONS INTO ALL SLIDES ===")
+    range_glossary = saved_glossary(glossary_path, backend, glossary) if not debug_mode else None
+    for slide_num, input_file, extracted_file, entries in decks:
         try:
-            translate_ipe_file(input_file, batch_size, max_elements, api_key, debug_mode)
-            print(f"Successfully processed slide {slide_num:02d}")
+            if not debug_mode:
+                save_manifest(manifest_path_for(extracted_file), entries, translations, backend.model, PROMPT_VERSION, range_glossary)
+            translated_file = write_translations(extracted_file, entries, translations, check_latex=not debug_mode)
+            ipe_with_ids = input_file.rsplit('.', 1)[0] + '_en.ipe'
+            merge_translations(ipe_with_ids, translated_file)
+            logger.info(f"Successfully processed slide {slide_num:02d}")
         except Exception as e:
-            print(f"Error processing slide {slide_num:02d}: {e}")
-            print("Continuing with next slide...")
+            logger.error(f"Error processing slide {slide_num:02d}: {e}")
+            logger.info("Continuing with next slide...")
+
+def translate_slides_range_parallel(start_slide, end_slide, batch_size=100, max_elements=1000000, api_key=None, debug_mode=False, concurrency=4, base_url=None, cache_path=DEFAULT_CACHE_PATH, resume=False, workers=None, incremental=True, backend=None, glossary=True):
+    """
+    Translate a range of slides as a pipeline.
+    
+    Extraction and merging run on a process pool, translation runs on one shared async
+    backend. Extracted decks wait in a bounded queue, so the next deck is extracted while
+    the previous ones are being translated. A failing deck does not stop the others.
+    Takes the same arguments as translate_slides_range.
+    """
+    workers = workers or min(4, os.cpu_count() or 1)
+    backend = resolve_backend(backend, api_key, base_url, debug_mode)
+    if debug_mode:
+        logger.info("=== RUNNING IN DEBUG MODE - NO API CALLS WILL BE MADE ===")
+    
+    slides = []
+    for slide_num in range(start_slide, end_slide + 1):
+        input_file = f"slides/slides{slide_num:02d}.ipe"
+        if not os.path.exists(input_file):
+            logger.warning(f"\nWARNING: File {input_file} not found, skipping...")
             continue
+        slides.append((slide_num, input_file))
+    
+    results = asyncio.run(_run_pipeline(slides, batch_size=batch_size, max_elements=max_elements, backend=backend, concurrency=concurrency,
+                                        cache_path=cache_path, resume=resume, workers=workers, incremental=incremental, glossary=glossary, debug_mode=debug_mode))
+    
+    # The summary is always printed, like the run summary of the report
+    print("\n=== SUMMARY ===")
+    for slide_num, _ in slides:
+        status, elapsed = results[slide_num]
+        print(f"Slide {slide_num:02d}: {status} ({elapsed:.1f}s)")
+    succeeded = sum(1 for status, _ in results.values() if status == "OK")
+    current_report().count("decks", len(slides))
+    current_report().count("failed_decks", len(slides) - succeeded)
+    print(f"{succeeded} of {len(slides)} slides translated successfully")
+
+async def _run_pipeline(slides, batch_size, max_elements, backend, concurrency, cache_path, resume, workers, incremental, glossary, debug_mode):
+    """
+    Run extraction, translation and merging of all slides as an async pipeline.
+    In debug mode the decks get mock translations and the backend is not opened.
+    Returns a dict mapping each slide number to (status, elapsed seconds).
+    """
+    loop = asyncio.get_running_loop()
+    report = current_report()
+    queue = asyncio.Queue(maxsize=workers)
+    results = {}
+    started = {}
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        async def extract_all():
+            for slide_num, input_file in slides:
+                started[slide_num] = time.perf_counter()
+                try:
+                    # The worker processes have their own reports, so extraction and merging are timed here
+                    with report.stage("extract"):
+                        extracted_file = await loop.run_in_executor(pool, extract_or_resume, input_file, max_elements, resume)
+                except Exception as e:
+                    logger.error(f"Error extracting slide {slide_num:02d}: {e}")
+                    results[slide_num] = (f"extraction failed: {e}", time.perf_counter() - started[slide_num])
+                    continue
+                # Blocks while `workers` extracted decks are already waiting for translation
+                await queue.put((slide_num, input_file, extracted_file))
+            for _ in range(workers):
+                await queue.put(None)
+        
+        async def translate_and_merge(backend, limiter):
+            while (item := await queue.get()) is not None:
+                slide_num, input_file, extracted_file = item
+                try:
+                    entries = read_extracted_entries(extracted_file)
+                    manifest_path = manifest_path_for(extracted_file)
+                    glossary_path = glossary_path_for(extracted_file)
+                    known_translations = None
+                    if incremental and not debug_mode:
+                        known_translations = diff_against_manifest(entries, load_manifest(manifest_path, backend.model, PROMPT_VERSION), saved_glossary(glossary_path, backend, glossary))
+                    translations = await translate_entries_async(entries, backend, limiter, batch_size, cache_path=cache_path, journal_path=journal_path_for(extracted_file), resume=resume, known_translations=known_translations, pages=read_pages(extracted_file), glossary_path=glossary_path, glossary=glossary, debug_mode=debug_mode)
+                    if not debug_mode:
+                        save_manifest(manifest_path, entries, translations, backend.model, PROMPT_VERSION, saved_glossary(glossary_path, backend, glossary))
+                    translated_file = write_translations(extracted_file, entries, translations, check_latex=not debug_mode)
+                    ipe_with_ids = input_file.rsplit('.', 1)[0] + '_en.ipe'
+                    with report.stage("merge"):
+                        await loop.run_in_executor(pool, merge_translations, ipe_with_ids, translated_file)
+                    results[slide_num] = ("OK", time.perf_counter() - started[slide_num])
+                    logger.info(f"Successfully processed slide {slide_num:02d}")
+                except Exception as e:
+                    logger.error(f"Error processing slide {slide_num:02d}: {e}")
+                    results[slide_num] = (f"failed: {e}", time.perf_counter() - started[slide_num])
+        
+        async def run_stages(backend, limiter):
+            await asyncio.gather(extract_all(), *(translate_and_merge(backend, limiter) for _ in range(workers)))
+        
+        if debug_mode:
+            await run_stages(backend, None)
+        else:
+            # All decks share one backend client and one rate limiter
+            async with backend:
+                await run_stages(backend, AdaptiveLimiter(concurrency))
     
-    print(f"\n=== COMPLETED BATCH TRANSLATION OF SLIDES {start_slide:02d} TO {end_slide:02d} ===")
+    return results
 
 # Usage
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import os
+from openai import AsyncOpenAI
+from mock_backend import MockChatClient
+
+MODEL = "gpt-4o"
+TEMPERATURE = 0
+
+# Default address of a local OpenAI-compatible server (llama.cpp's llama-server listens on port 8080)
+LOCAL_BASE_URL = "http://localhost:8080/v1"
+# llama.cpp serves whatever model it was started with, so any name works there;
+# vLLM rejects requests unless `model` is the name of the served model
+LOCAL_MODEL = "local-model"
+
+class OpenAIBackend:
+    """
+    Sends the translation requests to the OpenAI API, or to another server given by `base_url`.
+
+    A backend only knows how to reach a model; batching, concurrency, retries and parsing are
+    shared by all backends. Use it as `async with backend:`, which creates `backend.client`
+    inside the event loop that uses it and closes it again afterwards.
+    """
+    name = "openai"
+    supports_batch_api = True
+
+    def __init__(self, api_key=None, model=MODEL, temperature=TEMPERATURE, base_url=None):
+        if api_key is None:
+            api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OpenAI API key is required. Either pass it as an argument or set OPENAI_API_KEY environment variable.")
+        self.api_key = api_key
+        self.model = model
+        self.temperature = temperature
+        self.base_url = base_url
+        self.client = None
+
+    def create_client(self):
+        # Retries are handled by AdaptiveLimiter, not by the client
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    def describe(self):
+        """
+        Settings of the backend for the run report.
+        """
+        return {"backend": self.name, "model": self.model, "temperature": self.temperature, "base_url": self.base_url}
+
+    async def __aenter__(self):
+        self.client = self.create_client()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.client.close()
+        self.client = None
+
+class LocalBackend(OpenAIBackend):
+    """
+    A local server with an OpenAI-compatible chat completions endpoint, such as llama.cpp's
+    llama-server or vLLM. Such servers ignore the API key and do not offer the Batch API.
+
+    Usage:
+        translate_ipe_file("slides/slides01.ipe", backend=LocalBackend("qwen2.5-14b-instruct", "http://localhost:8000/v1"))
+    """
+    name = "local"
+    supports_batch_api = False
+
+    def __init__(self, model=LOCAL_MODEL, base_url=LOCAL_BASE_URL, temperature=TEMPERATURE, api_key="local"):
+        super().__init__(api_key, model, temperature, base_url)
+
+class MockBackend(OpenAIBackend):
+    """
+    Answers all requests locally with MockChatClient, for tests and benchmarks without network access.
+    The client (and its request and token counters) is kept between runs.
+    """
+    name = "mock"
+    supports_batch_api = True
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=None, model="mock", temperature=TEMPERATURE):
+        self.mock = MockChatClient(latency, failure_rate, seed)
+        self.model = model
+        self.temperature = temperature
+        self.base_url = None
+        self.client = None
+
+    def create_client(self):
+        return self.mock
+
+BACKENDS = {"openai": OpenAIBackend, "local": LocalBackend, "mock": MockBackend}
+
+def create_backend(backend=None, api_key=None, base_url=None, model=None):
+    """
+    Turn the `backend` argument of a run into a backend.
+
+    The runs themselves only take a backend name or instance, so to use a local model
+    under its own name (which vLLM requires), pass `LocalBackend(model, base_url)` or a
+    backend created here with `model`.
+
+    Args:
+        backend: A backend instance (returned as it is), one of the names in BACKENDS,
+            or None for the OpenAI API
+        api_key: API key for the OpenAI backend
+        base_url: Server URL for the OpenAI and local backends
+        model: Model to use instead of the backend's default (MODEL, LOCAL_MODEL or "mock")
+
+    Returns:
+        The backend
+    """
+    if backend is None or backend == "openai":
+        return OpenAIBackend(api_key, model=model or MODEL, base_url=base_url)
+    if backend == "local":
+        return LocalBackend(model=model or LOCAL_MODEL, base_url=base_url or LOCAL_BASE_URL)
+    if backend == "mock":
+        return MockBackend(model=model or "mock")
+    if isinstance(backend, str):
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    return backend
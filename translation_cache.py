@@ -0,0 +1,157 @@
+import os
+import time
+import sqlite3
+import json
+import hashlib
+import logging
+from glossary import glossary_for_batch, terms_match
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = "translation_cache.sqlite"
+
+def normalize_text(text):
+    """
+    Normalize a source text before hashing, so that whitespace-only differences
+    (line endings, trailing spaces) still hit the same cache entry.
+    """
+    lines = text.strip().replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+def cache_key(text, model, prompt_version):
+    """
+    Content address of a translation: hash of the normalized text plus model and prompt version.
+    """
+    payload = f"{model}\0{prompt_version}\0{normalize_text(text)}"
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class TranslationCache:
+    """
+    Translation memory stored in a SQLite file.
+
+    Entries are keyed by `cache_key`, so a translation is reused for the same source
+    text only as long as the model and prompt stay the same. Every entry also records the
+    glossary terms that were in its prompt; it is only reused while none of them got a
+    different translation in the current glossary (see glossary.terms_match).
+
+    Args:
+        path: Path to the SQLite file (created if it does not exist)
+        model: Model name that is part of every key
+        prompt_version: Prompt version that is part of every key
+        max_entries: Keep at most this many entries (least recently used are evicted first)
+        max_age_days: Evict entries that were not used for this many days
+    """
+    def __init__(self, path, model, prompt_version, max_entries=100000, max_age_days=365):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, source TEXT NOT NULL, translation TEXT NOT NULL, "
+            "model TEXT NOT NULL, prompt_version TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        # Caches written before glossaries existed have no terms column
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(translations)")]
+        if "terms" not in columns:
+            self.connection.execute("ALTER TABLE translations ADD COLUMN terms TEXT NOT NULL DEFAULT '{}'")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self.connection.commit()
+
+    def key(self, text):
+        return cache_key(text, self.model, self.prompt_version)
+
+    def get_many(self, texts, glossary=None):
+        """
+        Look up several source texts at once. Entries whose glossary terms were translated
+        differently in `glossary` count as misses.
+        Returns a dict mapping each found source text to its cached translation.
+        """
+        keys = {self.key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        # Stay below SQLite's limit on the number of query parameters
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i+500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT key, translation, terms FROM translations WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, translation, terms in rows:
+                if terms_match(json.loads(terms), glossary):
+                    found[keys[key]] = translation
+
+        if found:
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(now, self.key(text)) for text in found]
+            )
+            self.connection.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, pairs, glossary=None):
+        """
+        Store (source text, translation) pairs, together with the terms of `glossary` they contain.
+        """
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO translations "
+            "(key, source, translation, model, prompt_version, terms, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(self.key(source), source, translation, self.model, self.prompt_version,
+              json.dumps(glossary_for_batch(glossary, [(None, source)]), ensure_ascii=False), now, now)
+             for source, translation in pairs]
+        )
+        self.connection.commit()
+
+    def evict(self):
+        """
+        Remove entries older than `max_age_days` and trim the cache to `max_entries`.
+        Returns the number of removed entries.
+        """
+        removed = 0
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += self.connection.execute(
+                "DELETE FROM translations WHERE last_used < ?", (cutoff,)
+            ).rowcount
+        if self.max_entries is not None:
+            removed += self.connection.execute(
+                "DELETE FROM translations WHERE key NOT IN "
+                "(SELECT key FROM translations ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            ).rowcount
+        self.connection.commit()
+        return removed
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def report(self):
+        total = self.hits + self.misses
+        hit_rate = 100 * self.hits / total if total else 0
+        logger.info(f"Translation cache: {self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), {len(self)} entries in {self.path}")
+
+    def close(self):
+        removed = self.evict()
+        if removed:
+            logger.info(f"Translation cache: evicted {removed} entries")
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
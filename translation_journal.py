@@ -0,0 +1,58 @@
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TranslationJournal:
+    """
+    Write-ahead journal of finished translations, stored as a JSON lines file.
+
+    Every completed batch is appended (and flushed to disk) as soon as it arrives, so an
+    interrupted run can be resumed by translating only the identifiers not in the journal.
+
+    Args:
+        path: Path to the journal file
+        resume: If True, keep the existing journal; otherwise start a new one
+    """
+    def __init__(self, path, resume=False):
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        elif resume and os.path.exists(path):
+            self._drop_incomplete_tail()
+
+    def _drop_incomplete_tail(self):
+        # A crash while writing leaves a last line without newline; cut it off so new records start on a fresh line
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                logger.warning(f"WARNING: Dropping incomplete last line of journal {self.path}")
+                f.truncate(content.rfind(b'\n') + 1)
+
+    def load(self):
+        """
+        Read all translations recorded so far.
+        Returns a dict mapping identifiers to translations.
+        """
+        translations = {}
+        if not os.path.exists(self.path):
+            return translations
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    translations.update(json.loads(line)["translations"])
+                except (ValueError, KeyError):
+                    logger.warning(f"WARNING: Ignoring unreadable line in journal {self.path}")
+        return translations
+
+    def record(self, translations):
+        """
+        Append the translations of one completed batch.
+        """
+        if not translations:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"translations": translations}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
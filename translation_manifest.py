@@ -0,0 +1,75 @@
+import os
+import json
+import logging
+from translation_cache import normalize_text
+from latex_validator import validate_translation
+from glossary import glossary_for_batch, terms_match
+
+logger = logging.getLogger(__name__)
+
+def manifest_path_for(extracted_filepath):
+    """
+    Path of the manifest that belongs to an _extracted.txt file.
+    """
+    return extracted_filepath.rsplit('.', 1)[0] + '_manifest.json'
+
+def load_manifest(path, model, prompt_version):
+    """
+    Read the manifest of the previous run of a deck.
+
+    Returns:
+        Dict mapping identifiers to {"source": ..., "translation": ..., "terms": ...}; empty if there is
+        no manifest or it was written with a different model or prompt
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get("model") != model or manifest.get("prompt_version") != prompt_version:
+        logger.info(f"Manifest {path} was written with a different model or prompt, translating everything again")
+        return {}
+    return manifest["entries"]
+
+def save_manifest(path, valid_entries, translations, model, prompt_version, glossary=None):
+    """
+    Store source, translation and glossary terms of every translated entry of a deck for the next run.
+    Translations that break the LaTeX structure are left out, so they are translated again.
+    """
+    entries = {
+        identifier: {"source": text, "translation": translations[identifier], "terms": glossary_for_batch(glossary, [(identifier, text)])}
+        for identifier, text in valid_entries
+        if identifier in translations and not validate_translation(text, translations[identifier])
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"model": model, "prompt_version": prompt_version, "entries": entries}, f, ensure_ascii=False, indent=1)
+    logger.info(f"Manifest with {len(entries)} entries saved to: {path}")
+
+def diff_against_manifest(valid_entries, manifest, glossary=None):
+    """
+    Match the entries of the current deck against the previous run.
+
+    An entry is unchanged if its identifier is in the manifest with the same text and none of
+    the glossary terms it was translated with got a different translation in `glossary`
+    (see glossary.terms_match). Since identifiers
+    include the position, an element that only moved gets a new identifier; its translation
+    is still reused by matching the text.
+
+    Returns:
+        Dict mapping the identifiers of unchanged and moved entries to their previous translations
+    """
+    by_text = {normalize_text(entry["source"]): entry for entry in manifest.values()}
+    reused = {}
+    unchanged = 0
+    for identifier, text in valid_entries:
+        previous = manifest.get(identifier)
+        if previous is not None and normalize_text(previous["source"]) == normalize_text(text):
+            if terms_match(previous.get("terms", {}), glossary):
+                reused[identifier] = previous["translation"]
+                unchanged += 1
+        elif normalize_text(text) in by_text and terms_match(by_text[normalize_text(text)].get("terms", {}), glossary):
+            reused[identifier] = by_text[normalize_text(text)]["translation"]
+
+    if manifest:
+        moved = len(reused) - unchanged
+        logger.info(f"Incremental: {unchanged} unchanged, {moved} moved, {len(valid_entries) - len(reused)} added or changed entries")
+    return reused